@@ -72,4 +72,15 @@ class IsAuthenticatedOrService(BasePermission):
         if request.user and request.user.is_authenticated:
             return True
             
-        return False
\ No newline at end of file
+        return False
+
+class IsServiceOrAdmin(BasePermission):
+    """
+    Permission class that allows access to internal services or admin users only
+    """
+    def has_permission(self, request, view):
+        if hasattr(request, 'auth') and request.auth == 'service':
+            return True
+
+        user = request.user
+        return bool(user and user.is_authenticated and getattr(user.role, 'name', None) == 'ADMIN')
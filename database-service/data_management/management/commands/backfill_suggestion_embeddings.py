@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from data_management.models import SuggestionTemplate
+
+
+class Command(BaseCommand):
+    help = (
+        "Encode suggestion templates whose embedding is missing or was produced by a "
+        "different model version, in large batches (requires sentence-transformers)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            type=str,
+            default="all-MiniLM-L6-v2",
+            help="Embedding model name; recorded as the embedding model version <model>/torch.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=256,
+            help="Templates encoded and written per batch (default: 256)",
+        )
+        parser.add_argument(
+            "--cancer-type",
+            type=str,
+            help="Only backfill templates for this cancer type name",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-encode every template, not just missing or stale ones",
+        )
+
+    def handle(self, *args, **opts):
+        model_name = opts["model"]
+        # sentence-transformers runs the torch backend; same version string as the suggestion service
+        model_version = SuggestionTemplate.torch_encoder_version(model_name)
+        batch_size = opts["batch_size"]
+
+        if opts["force"]:
+            qs = SuggestionTemplate.objects.all()
+        else:
+            qs = SuggestionTemplate.needing_embedding(model_version)
+        if opts["cancer_type"]:
+            qs = qs.filter(cancer_type__cancer_type__iexact=opts["cancer_type"].strip())
+
+        pending = qs.count()
+        if not pending:
+            self.stdout.write(self.style.SUCCESS("All suggestion templates are up to date"))
+            return
+
+        try:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+            self.stdout.write(self.style.NOTICE(f"Embedding model loaded: {model_name}"))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Failed to load embedding model '{model_name}': {e}"))
+            return
+
+        # Walk by id so rows fixed in earlier batches are not revisited
+        updated = 0
+        last_id = 0
+        while True:
+            templates = list(qs.filter(id__gt=last_id).order_by("id").only("id", "text")[:batch_size])
+            if not templates:
+                break
+            last_id = templates[-1].id
+
+            vectors = model.encode(
+                [t.text for t in templates],
+                batch_size=min(batch_size, 128),
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+            now = timezone.now()
+            for template, vector in zip(templates, vectors):
+                template.embedding = vector.tolist()
+                template.embedding_model = model_version
+                template.updated_at = now
+
+            with transaction.atomic():
+                SuggestionTemplate.objects.bulk_update(templates, ["embedding", "embedding_model", "updated_at"])
+            updated += len(templates)
+            self.stdout.write(f"Embedded {updated}/{pending} templates")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} suggestion template embeddings"))
@@ -28,7 +28,7 @@ class Command(BaseCommand):
         parser.add_argument(
             "--compute-embeddings",
             action="store_true",
-            help="Optionally compute and store embedding_json for each question "
+            help="Optionally compute and store the embedding for each question "
                  "(requires sentence-transformers installed).",
         )
         parser.add_argument(
@@ -43,6 +43,7 @@ class Command(BaseCommand):
         clear_existing = opts["clear"]
         do_embed = opts["compute_embeddings"]
         model_name = opts["model"]
+        model_version = SuggestionTemplate.torch_encoder_version(model_name)
 
         # Resolve relative path
         if not os.path.isabs(file_path):
@@ -112,7 +113,8 @@ class Command(BaseCommand):
                         continue
                     defaults = {}
                     if do_embed and embeddings is not None:
-                        defaults["embedding_json"] = json.dumps(embeddings[idx].tolist())
+                        defaults["embedding"] = embeddings[idx].tolist()
+                        defaults["embedding_model"] = model_version
 
                     obj, made = SuggestionTemplate.objects.get_or_create(
                         cancer_type=cancer_type_obj,
@@ -123,9 +125,10 @@ class Command(BaseCommand):
                         created += 1
                     else:
                         # chose to compute embeddings and none stored yet, update
-                        if do_embed and (not obj.embedding_json) and embeddings is not None:
-                            obj.embedding_json = json.dumps(embeddings[idx].tolist())
-                            obj.save(update_fields=["embedding_json"])
+                        if do_embed and obj.embedding is None and embeddings is not None:
+                            obj.embedding = embeddings[idx].tolist()
+                            obj.embedding_model = model_version
+                            obj.save(update_fields=["embedding", "embedding_model", "updated_at"])
                             updated_embed += 1
 
                     total += 1
@@ -0,0 +1,124 @@
+import logging
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from data_management.vector_indexes import (
+    GLOBAL_INDEX_NAME, cancer_type_index_name, ivfflat_lists_for, using_clause
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "(Re)build the ANN indexes on rag_embeddings.embedding_vector as either "
+        "IVFFlat (lists sized to the current row count) or HNSW: the global index "
+        "plus one partial index per cancer type that has embeddings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--method",
+            choices=["ivfflat", "hnsw"],
+            default="hnsw",
+            help="Index method (default: hnsw)",
+        )
+        parser.add_argument(
+            "--lists",
+            type=int,
+            default=None,
+            help="IVFFlat lists; defaults to a value sized from the current row count",
+        )
+        parser.add_argument(
+            "--m",
+            type=int,
+            default=settings.RAG_HNSW_M,
+            help="HNSW max connections per layer (default: RAG_HNSW_M)",
+        )
+        parser.add_argument(
+            "--ef-construction",
+            type=int,
+            default=settings.RAG_HNSW_EF_CONSTRUCTION,
+            help="HNSW candidate list size during build (default: RAG_HNSW_EF_CONSTRUCTION)",
+        )
+        parser.add_argument(
+            "--maintenance-work-mem",
+            type=str,
+            default=None,
+            help="Optional maintenance_work_mem for the build session, e.g. '1GB'",
+        )
+        parser.add_argument(
+            "--global-only",
+            action="store_true",
+            help="Only rebuild the global index, skip the per-cancer-type partial indexes",
+        )
+        parser.add_argument(
+            "--concurrently",
+            action="store_true",
+            help="Build without blocking writes (CREATE INDEX CONCURRENTLY)",
+        )
+
+    def handle(self, *args, **opts):
+        method = opts["method"]
+        if method == "hnsw" and (opts["m"] < 2 or opts["ef_construction"] < 2 * opts["m"]):
+            raise CommandError("HNSW requires m >= 2 and ef_construction >= 2 * m")
+        if opts["lists"] is not None and opts["lists"] < 1:
+            raise CommandError("--lists must be at least 1")
+
+        with connection.cursor() as cursor:
+            if opts["maintenance_work_mem"]:
+                cursor.execute("SET maintenance_work_mem = %s", [opts["maintenance_work_mem"]])
+
+            cursor.execute("SELECT count(*) FROM rag_embeddings")
+            total = cursor.fetchone()[0]
+            targets = [(GLOBAL_INDEX_NAME, None, total)]
+
+            if not opts["global_only"]:
+                cursor.execute(
+                    "SELECT cancer_type_id, count(*) FROM rag_embeddings "
+                    "WHERE cancer_type_id IS NOT NULL GROUP BY cancer_type_id ORDER BY cancer_type_id"
+                )
+                targets += [
+                    (cancer_type_index_name(ct_id), ct_id, count)
+                    for ct_id, count in cursor.fetchall()
+                ]
+
+            for name, cancer_type_id, row_count in targets:
+                self._rebuild(cursor, name, cancer_type_id, row_count, opts)
+
+            cursor.execute("ANALYZE rag_embeddings")
+
+    def _rebuild(self, cursor, name, cancer_type_id, row_count, opts):
+        method = opts["method"]
+        concurrently = "CONCURRENTLY " if opts["concurrently"] else ""
+        new_name = f"{name}_new"
+        where = f" WHERE cancer_type_id = {int(cancer_type_id)}" if cancer_type_id is not None else ""
+
+        if method == "ivfflat":
+            lists = opts["lists"] or ivfflat_lists_for(row_count)
+            using = using_clause("ivfflat", lists=lists)
+            summary = f"IVFFlat lists={lists}"
+        else:
+            using = using_clause("hnsw", m=opts["m"], ef_construction=opts["ef_construction"])
+            summary = f"HNSW m={opts['m']} ef_construction={opts['ef_construction']}"
+
+        self.stdout.write(self.style.NOTICE(f"Building {name} ({summary}) over {row_count} embeddings..."))
+
+        try:
+            # Same advisory lock as vector_indexes._build_cancer_type_index, so a
+            # background build and this rebuild never touch the same index at once
+            cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", [name])
+            try:
+                # Build the replacement first so searches keep an index until the swap
+                cursor.execute(f"DROP INDEX {concurrently}IF EXISTS {new_name}")
+                cursor.execute(f"CREATE INDEX {concurrently}{new_name} ON rag_embeddings USING {using}{where}")
+                cursor.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+                cursor.execute(f"ALTER INDEX {new_name} RENAME TO {name}")
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [name])
+        except Exception as e:
+            logger.error(f"Error rebuilding vector index {name}: {str(e)}")
+            raise CommandError(f"Failed to rebuild vector index {name}: {str(e)}")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {name} as {summary} ({row_count} rows)"))
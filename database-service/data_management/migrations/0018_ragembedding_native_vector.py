@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4
+
+from django.db import migrations
+import pgvector.django
+
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_embedding_vector(apps, schema_editor):
+    """Copy JSON embeddings into the vector column for rows that never got one."""
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            cursor.execute(
+                """
+                UPDATE rag_embeddings
+                SET embedding_vector = embedding::text::vector
+                WHERE id IN (
+                    SELECT id FROM rag_embeddings
+                    WHERE embedding_vector IS NULL AND embedding IS NOT NULL
+                    LIMIT %s
+                )
+                """,
+                [BACKFILL_BATCH_SIZE]
+            )
+            if cursor.rowcount == 0:
+                break
+
+
+class Migration(migrations.Migration):
+    # Each backfill batch commits on its own so large tables are not
+    # rewritten in one long-running transaction.
+    atomic = False
+
+    dependencies = [
+        ('data_management', '0017_remove_clinician_specialization_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_embedding_vector, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='ragembedding',
+                    name='embedding',
+                    field=pgvector.django.VectorField(db_column='embedding_vector', dimensions=1536),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    sql="""
+                        DELETE FROM rag_embeddings WHERE embedding_vector IS NULL;
+                        ALTER TABLE rag_embeddings ALTER COLUMN embedding_vector SET NOT NULL;
+                        ALTER TABLE rag_embeddings DROP COLUMN embedding;
+                    """,
+                    reverse_sql="""
+                        ALTER TABLE rag_embeddings ADD COLUMN embedding jsonb;
+                        UPDATE rag_embeddings SET embedding = embedding_vector::text::jsonb;
+                        ALTER TABLE rag_embeddings ALTER COLUMN embedding SET NOT NULL;
+                        ALTER TABLE rag_embeddings ALTER COLUMN embedding_vector DROP NOT NULL;
+                    """,
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0018_ragembedding_native_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ragembedding',
+            name='cancer_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rag_embeddings', to='data_management.cancertype'),
+        ),
+        migrations.RunSQL(
+            # Denormalize the document's cancer type onto existing embeddings
+            sql="""
+                UPDATE rag_embeddings e
+                SET cancer_type_id = d.cancer_type_id
+                FROM rag_documents d
+                WHERE e.document_id = d.file_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='ragembedding',
+            index=models.Index(fields=['cancer_type'], name='rag_embeddi_cancer__591f4d_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4
+
+from django.db import migrations, models
+import pgvector.django
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0019_ragembedding_cancer_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ragembedding',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='ragembedding',
+            name='embedding',
+            field=pgvector.django.VectorField(blank=True, db_column='embedding_vector', dimensions=1536, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ragembedding',
+            index=models.Index(fields=['content_hash'], name='rag_embeddi_content_52fddb_idx'),
+        ),
+        migrations.RunSQL(
+            # When the row holding the vector for deduplicated text is deleted,
+            # hand the vector to one remaining copy in the same cancer type so the
+            # text stays searchable.
+            sql="""
+                CREATE OR REPLACE FUNCTION rag_embeddings_promote_duplicate() RETURNS trigger AS $$
+                BEGIN
+                    IF OLD.embedding_vector IS NOT NULL AND OLD.content_hash <> '' THEN
+                        UPDATE rag_embeddings
+                        SET embedding_vector = OLD.embedding_vector
+                        WHERE id = (
+                            SELECT id FROM rag_embeddings
+                            WHERE content_hash = OLD.content_hash
+                              AND cancer_type_id IS NOT DISTINCT FROM OLD.cancer_type_id
+                              AND embedding_vector IS NULL
+                            LIMIT 1
+                        );
+                    END IF;
+                    RETURN OLD;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER rag_embeddings_promote_duplicate_trg
+                AFTER DELETE ON rag_embeddings
+                FOR EACH ROW EXECUTE FUNCTION rag_embeddings_promote_duplicate();
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS rag_embeddings_promote_duplicate_trg ON rag_embeddings;
+                DROP FUNCTION IF EXISTS rag_embeddings_promote_duplicate();
+            """,
+        ),
+    ]
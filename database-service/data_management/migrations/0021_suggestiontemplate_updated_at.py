@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0020_ragembedding_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='suggestiontemplate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4
+
+from django.db import migrations, models
+import pgvector.django
+
+
+# Every embedding written so far came from the suggestion service's (torch) encoder;
+# same string as its encoder_version()
+LEGACY_EMBEDDING_MODEL = 'all-MiniLM-L6-v2/torch'
+
+
+def copy_json_embeddings(apps, schema_editor):
+    """Move embedding_json (a JSON array, or a JSON string holding one) into the vector column."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE suggestion_templates
+            SET embedding_vector = (
+                    CASE jsonb_typeof(embedding_json)
+                        WHEN 'string' THEN embedding_json #>> '{}'
+                        ELSE embedding_json::text
+                    END
+                )::vector,
+                embedding_model = %s
+            WHERE embedding_json IS NOT NULL AND jsonb_typeof(embedding_json) <> 'null'
+            """,
+            [LEGACY_EMBEDDING_MODEL]
+        )
+
+
+def copy_vector_embeddings(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE suggestion_templates SET embedding_json = embedding_vector::text::jsonb "
+            "WHERE embedding_vector IS NOT NULL"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0021_suggestiontemplate_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='suggestiontemplate',
+            name='embedding',
+            field=pgvector.django.VectorField(blank=True, db_column='embedding_vector', dimensions=384, null=True),
+        ),
+        migrations.AddField(
+            model_name='suggestiontemplate',
+            name='embedding_model',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+        migrations.RunPython(copy_json_embeddings, copy_vector_embeddings),
+        migrations.RemoveField(
+            model_name='suggestiontemplate',
+            name='embedding_json',
+        ),
+    ]
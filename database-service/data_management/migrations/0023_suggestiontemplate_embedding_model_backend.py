@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+# 0022 first stamped migrated embeddings with the bare model name; the suggestion
+# service versions embeddings by model, backend and quantization
+OLD_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+NEW_EMBEDDING_MODEL = 'all-MiniLM-L6-v2/torch'
+
+
+def add_backend(apps, schema_editor):
+    SuggestionTemplate = apps.get_model('data_management', 'SuggestionTemplate')
+    SuggestionTemplate.objects.filter(embedding_model=OLD_EMBEDDING_MODEL).update(embedding_model=NEW_EMBEDDING_MODEL)
+
+
+def remove_backend(apps, schema_editor):
+    SuggestionTemplate = apps.get_model('data_management', 'SuggestionTemplate')
+    SuggestionTemplate.objects.filter(embedding_model=NEW_EMBEDDING_MODEL).update(embedding_model=OLD_EMBEDDING_MODEL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0022_suggestiontemplate_vector_embedding'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_backend, remove_backend),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.utils import timezone
+from pgvector.django import VectorField
 import uuid
 
 
@@ -310,6 +311,13 @@ class RAGDocument(models.Model):
     
     def __str__(self):
         return f"{self.file.filename} - {self.cancer_type}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Keep the denormalized cancer type on embeddings in step with the document
+        moved = self.embeddings.exclude(cancer_type_id=self.cancer_type_id).update(cancer_type_id=self.cancer_type_id)
+        if moved:
+            RAGEmbedding.restore_duplicate_vectors()
 
 
 class RefreshToken(models.Model):
@@ -395,9 +403,15 @@ class RAGEmbedding(models.Model):
     """Store document embeddings for RAG system with PGVector"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     document = models.ForeignKey(RAGDocument, on_delete=models.CASCADE, related_name='embeddings')
+    # Denormalized from document.cancer_type so filtered search can use a partial ANN index
+    cancer_type = models.ForeignKey(CancerType, on_delete=models.CASCADE, null=True, blank=True, related_name='rag_embeddings')
     chunk_index = models.IntegerField()
     chunk_text = models.TextField()
-    embedding = models.JSONField()  # Will be handled as vector in queries
+    # NULL for a chunk whose identical text is already embedded in the same cancer type;
+    # search serves it through the row that holds the vector (same content_hash)
+    embedding = VectorField(dimensions=1536, db_column='embedding_vector', null=True, blank=True)
+    # sha256 of embedding model, splitter settings and chunk text
+    content_hash = models.CharField(max_length=64, blank=True, default='')
     metadata = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -407,11 +421,40 @@ class RAGEmbedding(models.Model):
         indexes = [
             models.Index(fields=['document', 'chunk_index']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['cancer_type']),
+            models.Index(fields=['content_hash']),
         ]
         unique_together = [['document', 'chunk_index']]
     
     def __str__(self):
         return f"Embedding {self.chunk_index} for {self.document.file.filename}"
+    
+    @staticmethod
+    def restore_duplicate_vectors():
+        """
+        Give a vector back to deduplicated chunks whose cancer type no longer
+        holds any embedded copy of the same text (e.g. after a document moved
+        to another cancer type).
+        """
+        from django.db import connection
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE rag_embeddings e
+                SET embedding_vector = src.embedding_vector
+                FROM (
+                    SELECT DISTINCT ON (content_hash) content_hash, embedding_vector
+                    FROM rag_embeddings
+                    WHERE embedding_vector IS NOT NULL AND content_hash <> ''
+                ) src
+                WHERE e.embedding_vector IS NULL
+                  AND e.content_hash = src.content_hash
+                  AND NOT EXISTS (
+                      SELECT 1 FROM rag_embeddings c
+                      WHERE c.content_hash = e.content_hash
+                        AND c.cancer_type_id IS NOT DISTINCT FROM e.cancer_type_id
+                        AND c.embedding_vector IS NOT NULL
+                  )
+            """)
 
 
 class RAGEmbeddingJob(models.Model):
@@ -478,7 +521,9 @@ class SuggestionTemplate(models.Model):
     cancer_type = models.ForeignKey(CancerType, on_delete=models.CASCADE, db_column='cancer_type_id', related_name='suggestion_templates')
     text = models.TextField()
 
-    embedding_json = models.JSONField(null=True, blank=True)
+    embedding = VectorField(dimensions=384, db_column='embedding_vector', null=True, blank=True)
+    embedding_model = models.CharField(max_length=128, blank=True, default='')  # encoder that produced `embedding`
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "suggestion_templates"
@@ -488,6 +533,16 @@ class SuggestionTemplate(models.Model):
     def __str__(self):
         return f"[{self.cancer_type}] {self.text[:60]}"
 
+    @staticmethod
+    def torch_encoder_version(model_name):
+        """Version string of a sentence-transformers (torch) encoding, matching the suggestion service's encoder_version()."""
+        return f"{model_name}/torch"
+
+    @classmethod
+    def needing_embedding(cls, model_version):
+        """Templates with no embedding, or one produced by a different encoder version."""
+        return cls.objects.filter(models.Q(embedding__isnull=True) | ~models.Q(embedding_model=model_version))
+
 class SuggestedHistory(models.Model):
     """What we already suggested in a given session (prevents repeats)."""
     session = models.ForeignKey(
@@ -132,11 +132,18 @@ class RAGDocumentSerializer(serializers.ModelSerializer):
 # RAG Embedding serializers
 class RAGEmbeddingSerializer(serializers.ModelSerializer):
     document_name = serializers.CharField(source='document.file.filename', read_only=True)
+    embedding = serializers.ListField(
+        child=serializers.FloatField(),
+        min_length=1536,
+        max_length=1536,
+        allow_null=True,
+        required=False
+    )
     
     class Meta:
         model = RAGEmbedding
         fields = ['id', 'document', 'document_name', 'chunk_index', 'chunk_text', 
-                 'embedding', 'metadata', 'created_at']
+                 'embedding', 'content_hash', 'metadata', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
@@ -160,6 +167,7 @@ class EmbeddingCreateSerializer(serializers.Serializer):
         min_length=1536,
         max_length=1536
     )
+    content_hash = serializers.CharField(required=False, allow_blank=True, max_length=64, default='')
     metadata = serializers.JSONField(required=False, default=dict)
 
 
@@ -169,6 +177,15 @@ class BulkEmbeddingCreateSerializer(serializers.Serializer):
         child=EmbeddingCreateSerializer(),
         allow_empty=False
     )
+    batch_size = serializers.IntegerField(required=False, min_value=1, max_value=5000)
+
+
+class EmbeddingHashLookupSerializer(serializers.Serializer):
+    hashes = serializers.ListField(
+        child=serializers.CharField(max_length=64),
+        allow_empty=False,
+        max_length=5000
+    )
 
 
 class EmbeddingSearchSerializer(serializers.Serializer):
@@ -179,6 +196,8 @@ class EmbeddingSearchSerializer(serializers.Serializer):
     )
     cancer_type_id = serializers.IntegerField(required=False, allow_null=True)
     k = serializers.IntegerField(default=5, min_value=1, max_value=50)
+    probes = serializers.IntegerField(required=False, min_value=1, max_value=1000)
+    ef_search = serializers.IntegerField(required=False, min_value=1, max_value=1000)
 
 
 class PatientAssignmentSerializer(serializers.ModelSerializer):
@@ -280,9 +299,17 @@ class ChatSessionSerializer(serializers.ModelSerializer):
         fields = ["id","patient_id", "title", "created_at", "messages", "suggestions"]
 
 class SuggestionTemplateSerializer(serializers.ModelSerializer):
+    embedding = serializers.ListField(
+        child=serializers.FloatField(),
+        min_length=384,
+        max_length=384,
+        allow_null=True,
+        required=False
+    )
+
     class Meta:
         model = SuggestionTemplate
-        fields = ("id", "cancer_type", "text", "embedding_json")
+        fields = ("id", "cancer_type", "text", "embedding", "embedding_model")
 
 class SuggestedHistorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,115 @@
+"""
+Helpers for the ANN indexes on rag_embeddings.embedding_vector.
+
+Besides the global index (rag_embeddings_vector_idx) every cancer type with
+embeddings gets a partial index restricted to its own rows, so the filtered
+search used by patient chat walks a small, type-specific graph instead of
+post-filtering the global one.
+"""
+import math
+import logging
+import threading
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_INDEX_NAME = 'rag_embeddings_vector_idx'
+
+# Cancer types whose partial index this process has seen built, or is building now
+_indexed = set()
+_building = set()
+_building_lock = threading.Lock()
+
+
+def ivfflat_lists_for(row_count):
+    """pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond that."""
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def using_clause(method, lists=None, m=None, ef_construction=None):
+    """Build the USING ... WITH (...) part of CREATE INDEX for the given method."""
+    if method == 'ivfflat':
+        return f"ivfflat (embedding_vector vector_cosine_ops) WITH (lists = {int(lists)})"
+    return (
+        f"hnsw (embedding_vector vector_cosine_ops) "
+        f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+    )
+
+
+def cancer_type_index_name(cancer_type_id):
+    return f"rag_embeddings_vector_ct{int(cancer_type_id)}_idx"
+
+
+def ensure_cancer_type_index(cancer_type_id):
+    """
+    Make sure the partial HNSW index for a cancer type gets built. Called after
+    embeddings are written so a new cancer type is indexed as soon as it has
+    data; the build itself runs in a background thread once the caller's
+    transaction commits, so the upload request never waits on it.
+    """
+    cancer_type_id = int(cancer_type_id)
+    if cancer_type_id in _indexed:
+        return
+    transaction.on_commit(lambda: _start_index_build(cancer_type_id))
+
+
+def _start_index_build(cancer_type_id):
+    with _building_lock:
+        if cancer_type_id in _indexed or cancer_type_id in _building:
+            return
+        _building.add(cancer_type_id)
+    threading.Thread(
+        target=_build_cancer_type_index,
+        args=(cancer_type_id,),
+        name=f"vector-index-ct{cancer_type_id}",
+        daemon=True,
+    ).start()
+
+
+def _build_cancer_type_index(cancer_type_id):
+    """
+    CREATE INDEX CONCURRENTLY on this thread's own (autocommit) connection, so
+    writes to rag_embeddings carry on during the build. A Postgres advisory lock
+    keeps other processes from building, or dropping, the same index meanwhile.
+    """
+    name = cancer_type_index_name(cancer_type_id)
+    using = using_clause(
+        'hnsw',
+        m=settings.RAG_HNSW_M,
+        ef_construction=settings.RAG_HNSW_EF_CONSTRUCTION
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [name])
+            if not cursor.fetchone()[0]:
+                return
+            try:
+                cursor.execute(
+                    "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                    "WHERE c.relname = %s", [name]
+                )
+                row = cursor.fetchone()
+                if row and row[0]:
+                    _indexed.add(cancer_type_id)
+                    return
+                if row:
+                    # A failed concurrent build leaves an invalid index behind
+                    cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                cursor.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON rag_embeddings "
+                    f"USING {using} WHERE cancer_type_id = {cancer_type_id}"
+                )
+                _indexed.add(cancer_type_id)
+                logger.info(f"Built vector index {name}")
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [name])
+    except Exception as e:
+        # Search still works through the global index; the next upload or the rebuild command retries
+        logger.error(f"Error creating vector index {name}: {str(e)}")
+    finally:
+        with _building_lock:
+            _building.discard(cancer_type_id)
+        connection.close()
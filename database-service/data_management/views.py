@@ -6,21 +6,33 @@ from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.core.cache import cache
 from django.conf import settings
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Count, Max, Prefetch
 from django.utils import timezone
+from django_redis import get_redis_connection
+from pgvector.django import CosineDistance
 from datetime import datetime, timedelta
+import hashlib
+import logging
+import time
+import uuid
 from .models import User, Role, Patient, Clinician, EventLog, CancerType, UserEncryptionKey, FileMetadata, FileAccessLog, RAGDocument, RefreshToken, Language, RAGEmbedding, RAGEmbeddingJob, PatientAssignment, MedicalRecordType, MedicalRecord, MedicalRecordAccess, ChatMessage, ChatSession
 from .models import SuggestionTemplate, SuggestedHistory
+from .vector_indexes import ensure_cancer_type_index
+from .authentication import IsAuthenticatedOrService, IsServiceOrAdmin
 from .serializers import (
     UserSerializer, PatientSerializer, ClinicianSerializer,
     EventLogSerializer, CancerTypeSerializer,
     FileMetadataSerializer, RAGDocumentSerializer, LanguageSerializer,
     RAGEmbeddingSerializer, RAGEmbeddingJobSerializer, EmbeddingCreateSerializer,
-    BulkEmbeddingCreateSerializer, EmbeddingSearchSerializer, PatientAssignmentSerializer,
+    BulkEmbeddingCreateSerializer, EmbeddingSearchSerializer, EmbeddingHashLookupSerializer,
+    PatientAssignmentSerializer,
     MedicalRecordTypeSerializer, MedicalRecordSerializer, MedicalRecordAccessSerializer,
     ChatMessageSerializer, ChatSessionSerializer, SuggestionTemplateSerializer, SuggestedHistorySerializer
 )
 
+logger = logging.getLogger(__name__)
+
 
 class LanguageViewSet(viewsets.ModelViewSet):
     queryset = Language.objects.filter(is_active=True)
@@ -762,6 +774,102 @@ class RefreshTokenViewSet(viewsets.ModelViewSet):
 
 
 # RAG Embedding Views
+def _embedded_hashes(cancer_type_id, hashes):
+    """Content hashes that already have a stored vector within the cancer type"""
+    hashes = [h for h in hashes if h]
+    if not hashes:
+        return set()
+    return set(
+        RAGEmbedding.objects.filter(
+            cancer_type_id=cancer_type_id,
+            content_hash__in=hashes,
+            embedding__isnull=False
+        ).values_list('content_hash', flat=True)
+    )
+
+
+def _bulk_insert_embeddings(document, chunks, batch_size):
+    """
+    Insert chunk text, metadata and the pgvector column for many chunks
+    with one multi-row INSERT per batch instead of one INSERT per chunk.
+    Chunks that already exist for the document are skipped, so a resumed
+    ingestion job can safely resend a batch. A chunk whose content_hash is
+    already embedded in the same cancer type is stored without a vector, so
+    shared passages are indexed once. Must be called inside a transaction.
+    """
+    from django.db import connection
+    from psycopg2.extras import execute_values, Json
+    
+    now = timezone.now()
+    insert_sql = """
+        INSERT INTO rag_embeddings
+            (id, document_id, cancer_type_id, chunk_index, chunk_text, content_hash, metadata, created_at, embedding_vector)
+        VALUES %s
+        ON CONFLICT (document_id, chunk_index) DO NOTHING
+    """
+    template = "(%s, %s, %s, %s, %s, %s, %s, %s, %s::vector)"
+    
+    embedded = _embedded_hashes(document.cancer_type_id, [chunk.get('content_hash') for chunk in chunks])
+    
+    def vector_for(chunk):
+        content_hash = chunk.get('content_hash')
+        if not content_hash:
+            return chunk['embedding']
+        if content_hash in embedded:
+            return None
+        embedded.add(content_hash)
+        return chunk['embedding']
+    
+    created = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(chunks), batch_size):
+            rows = [
+                (
+                    str(uuid.uuid4()),
+                    str(document.file_id),
+                    document.cancer_type_id,
+                    chunk['chunk_index'],
+                    chunk['chunk_text'],
+                    chunk.get('content_hash', ''),
+                    Json(chunk.get('metadata') or {}),
+                    now,
+                    vector_for(chunk),
+                )
+                for chunk in chunks[start:start + batch_size]
+            ]
+            execute_values(cursor, insert_sql, rows, template=template, page_size=batch_size)
+            created += cursor.rowcount
+    return created
+
+
+def _attach_duplicate_provenance(results, cancer_type_id=None):
+    """
+    Add the other documents containing each hit's exact chunk text, since
+    deduplicated copies carry no vector and never surface on their own.
+    """
+    hashes = {r['content_hash'] for r in results if r['content_hash']}
+    for result in results:
+        result['duplicate_documents'] = []
+    if not hashes:
+        return
+    
+    copies = RAGEmbedding.objects.filter(content_hash__in=hashes, embedding__isnull=True)
+    if cancer_type_id:
+        copies = copies.filter(cancer_type_id=cancer_type_id)
+    
+    by_hash = {}
+    for content_hash, document_id, filename, metadata in copies.values_list(
+        'content_hash', 'document__file_id', 'document__file__filename', 'metadata'
+    ):
+        by_hash.setdefault(content_hash, []).append({
+            'document_id': str(document_id),
+            'document_name': filename,
+            'page': (metadata or {}).get('page', 0)
+        })
+    for result in results:
+        result['duplicate_documents'] = by_hash.get(result['content_hash'], [])
+
+
 class RAGEmbeddingViewSet(viewsets.ModelViewSet):
     queryset = RAGEmbedding.objects.all()
     serializer_class = RAGEmbeddingSerializer
@@ -785,22 +893,19 @@ class RAGEmbeddingViewSet(viewsets.ModelViewSet):
                 # Get document
                 document = RAGDocument.objects.get(file_id=serializer.validated_data['document_id'])
                 
-                # Create embedding
+                # Create embedding (vector omitted if the same text is already embedded)
+                content_hash = serializer.validated_data.get('content_hash', '')
+                is_duplicate = content_hash in _embedded_hashes(document.cancer_type_id, [content_hash])
                 embedding = RAGEmbedding.objects.create(
                     document=document,
+                    cancer_type_id=document.cancer_type_id,
                     chunk_index=serializer.validated_data['chunk_index'],
                     chunk_text=serializer.validated_data['chunk_text'],
-                    embedding=serializer.validated_data['embedding'],
+                    content_hash=content_hash,
+                    embedding=None if is_duplicate else serializer.validated_data['embedding'],
                     metadata=serializer.validated_data.get('metadata', {})
                 )
-                
-                # Also store in vector column
-                from django.db import connection
-                with connection.cursor() as cursor:
-                    cursor.execute(
-                        "UPDATE rag_embeddings SET embedding_vector = %s WHERE id = %s",
-                        [serializer.validated_data['embedding'], str(embedding.id)]
-                    )
+                ensure_cancer_type_index(document.cancer_type_id)
                 
                 return Response(
                     RAGEmbeddingSerializer(embedding).data,
@@ -820,36 +925,31 @@ class RAGEmbeddingViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def bulk_create(self, request):
-        """Create multiple embeddings at once"""
+        """Create multiple embeddings at once using batched multi-row inserts"""
         serializer = BulkEmbeddingCreateSerializer(data=request.data)
         if serializer.is_valid():
             try:
                 document_id = serializer.validated_data['document_id']
                 document = RAGDocument.objects.get(file_id=document_id)
+                batch_size = serializer.validated_data.get(
+                    'batch_size', settings.RAG_BULK_INSERT_BATCH_SIZE
+                )
+                chunks = serializer.validated_data['chunks']
                 
-                created_embeddings = []
-                for chunk_data in serializer.validated_data['chunks']:
-                    embedding = RAGEmbedding.objects.create(
-                        document=document,
-                        chunk_index=chunk_data['chunk_index'],
-                        chunk_text=chunk_data['chunk_text'],
-                        embedding=chunk_data['embedding'],
-                        metadata=chunk_data.get('metadata', {})
-                    )
-                    created_embeddings.append(embedding)
+                started = time.perf_counter()
+                with transaction.atomic():
+                    created = _bulk_insert_embeddings(document, chunks, batch_size)
+                elapsed = time.perf_counter() - started
                 
-                # Bulk update vector column
-                from django.db import connection
-                with connection.cursor() as cursor:
-                    for i, embedding in enumerate(created_embeddings):
-                        cursor.execute(
-                            "UPDATE rag_embeddings SET embedding_vector = %s WHERE id = %s",
-                            [serializer.validated_data['chunks'][i]['embedding'], str(embedding.id)]
-                        )
+                if created:
+                    ensure_cancer_type_index(document.cancer_type_id)
                 
                 return Response({
-                    'message': f'Created {len(created_embeddings)} embeddings',
-                    'count': len(created_embeddings)
+                    'message': f'Created {created} embeddings',
+                    'count': created,
+                    'batch_size': batch_size,
+                    'elapsed_seconds': round(elapsed, 3),
+                    'rows_per_second': round(created / elapsed, 1) if elapsed > 0 else None
                 }, status=status.HTTP_201_CREATED)
                 
             except RAGDocument.DoesNotExist:
@@ -873,48 +973,40 @@ class RAGEmbeddingViewSet(viewsets.ModelViewSet):
                 query_embedding = serializer.validated_data['query_embedding']
                 cancer_type_id = serializer.validated_data.get('cancer_type_id')
                 k = serializer.validated_data['k']
+                probes = serializer.validated_data.get('probes', settings.RAG_IVFFLAT_PROBES)
+                # ef_search bounds how many HNSW candidates come back, so keep it >= k
+                ef_search = max(k, serializer.validated_data.get('ef_search', settings.RAG_HNSW_EF_SEARCH))
                 
-                # Build query with PGVector
-                from django.db import connection
-                
+                queryset = RAGEmbedding.objects.select_related('document__file').filter(embedding__isnull=False)
                 if cancer_type_id:
-                    query = """
-                        SELECT e.id, e.chunk_text, e.metadata, 
-                               e.embedding_vector <=> %s::vector as distance,
-                               d.file_id, f.filename
-                        FROM rag_embeddings e
-                        JOIN rag_documents d ON e.document_id = d.file_id
-                        JOIN file_metadata f ON d.file_id = f.id
-                        WHERE d.cancer_type_id = %s
-                        ORDER BY e.embedding_vector <=> %s::vector
-                        LIMIT %s
-                    """
-                    params = [query_embedding, cancer_type_id, query_embedding, k]
-                else:
-                    query = """
-                        SELECT e.id, e.chunk_text, e.metadata, 
-                               e.embedding_vector <=> %s::vector as distance,
-                               d.file_id, f.filename
-                        FROM rag_embeddings e
-                        JOIN rag_documents d ON e.document_id = d.file_id
-                        JOIN file_metadata f ON d.file_id = f.id
-                        ORDER BY e.embedding_vector <=> %s::vector
-                        LIMIT %s
-                    """
-                    params = [query_embedding, query_embedding, k]
+                    # Filter on the denormalized column so the planner can use the
+                    # cancer type's partial ANN index instead of post-filtering
+                    queryset = queryset.filter(cancer_type_id=cancer_type_id)
                 
-                with connection.cursor() as cursor:
-                    cursor.execute(query, params)
-                    results = []
-                    for row in cursor.fetchall():
-                        results.append({
-                            'id': str(row[0]),
-                            'chunk_text': row[1],
-                            'metadata': row[2],
-                            'distance': float(row[3]),
-                            'document_id': str(row[4]),
-                            'document_name': row[5]
-                        })
+                neighbours = (
+                    queryset
+                    .annotate(distance=CosineDistance('embedding', query_embedding))
+                    .order_by('distance')
+                    .only('id', 'chunk_text', 'content_hash', 'metadata', 'document__file__id', 'document__file__filename')[:k]
+                )
+                
+                # SET LOCAL scopes the recall knobs to this transaction only
+                from django.db import connection
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL ivfflat.probes = %s", [probes])
+                        cursor.execute("SET LOCAL hnsw.ef_search = %s", [ef_search])
+                    results = [{
+                        'id': str(row.id),
+                        'chunk_text': row.chunk_text,
+                        'metadata': row.metadata,
+                        'distance': float(row.distance),
+                        'document_id': str(row.document.file_id),
+                        'document_name': row.document.file.filename,
+                        'content_hash': row.content_hash
+                    } for row in neighbours]
+                
+                _attach_duplicate_provenance(results, cancer_type_id)
                 
                 return Response({
                     'results': results,
@@ -928,6 +1020,22 @@ class RAGEmbeddingViewSet(viewsets.ModelViewSet):
                 )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def lookup_hashes(self, request):
+        """Return stored vectors for known content hashes so ingestion can skip re-embedding"""
+        serializer = EmbeddingHashLookupSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        rows = (
+            RAGEmbedding.objects
+            .filter(content_hash__in=serializer.validated_data['hashes'], embedding__isnull=False)
+            .order_by('content_hash')
+            .distinct('content_hash')
+            .values_list('content_hash', 'embedding')
+        )
+        return Response({'embeddings': {content_hash: vector.tolist() for content_hash, vector in rows}})
+    
     @action(detail=False, methods=['get'])
     def has_embeddings(self, request):
         """Check if a document has embeddings"""
@@ -940,6 +1048,22 @@ class RAGEmbeddingViewSet(viewsets.ModelViewSet):
         
         exists = RAGEmbedding.objects.filter(document__file=document_id).exists()
         return Response({'has_embeddings': exists})
+    
+    @action(detail=False, methods=['get'])
+    def last_chunk_index(self, request):
+        """Highest committed chunk_index for a document, used to resume ingestion"""
+        document_id = request.query_params.get('document_id')
+        if not document_id:
+            return Response(
+                {'error': 'document_id parameter required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        from django.db.models import Max
+        last_index = RAGEmbedding.objects.filter(document__file=document_id).aggregate(
+            last=Max('chunk_index')
+        )['last']
+        return Response({'last_chunk_index': last_index})
 
 
 class RAGEmbeddingJobViewSet(viewsets.ModelViewSet):
@@ -1420,16 +1544,87 @@ class MedicalRecordAccessViewSet(viewsets.ModelViewSet):
         })
     
         
+def _templates_for(params):
+    """Suggestion templates filtered by cancer type id or name"""
+    qs = SuggestionTemplate.objects.all()
+    ct = (params.get('cancer_type') or '').strip()
+    ct_name = (params.get('cancer_type_name') or '').strip()
+    if ct:
+        qs = qs.filter(cancer_type_id=ct)
+    elif ct_name:
+        qs = qs.filter(cancer_type__cancer_type__iexact=ct_name)
+    return qs
+
+
+# a session's invalidation counter outlives any compute that read it
+SUGGESTION_GENERATION_TTL = 24 * 3600
+
+# most recent messages the suggestion context endpoint returns
+SUGGESTION_CONTEXT_MAX_MESSAGES = 50
+
+
+def _invalidate_suggestion_results(session_id):
+    """Drop the suggestion service's cached top_4/top_15 for a session (best-effort).
+    Bumping the generation also stops a /suggest already computing from storing a
+    result built from the context as it was before this write."""
+    try:
+        pipe = get_redis_connection('default').pipeline()
+        pipe.delete(f"suggest:result:{session_id}")
+        pipe.incr(f"suggest:gen:{session_id}")
+        pipe.expire(f"suggest:gen:{session_id}", SUGGESTION_GENERATION_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Suggestion result cache invalidation failed: {e}")
+
+
+def _publish_message_persisted(msg):
+    """Announce a stored chat message on the chat:messages stream (best-effort).
+    Assistant replies carry the patient's main cancer type and user id so the
+    suggestion service can precompute the next suggestions for that user."""
+    event = {'session_id': str(msg.session_id), 'message_id': str(msg.id), 'role': msg.role}
+    try:
+        if msg.role == 'assistant':
+            cancer_type, user_id = (
+                ChatSession.objects.filter(id=msg.session_id)
+                .values_list('patient__assignment__cancer_subtype__parent__cancer_type', 'patient__user_id')
+                .first()
+            ) or (None, None)
+            if cancer_type:
+                event['cancer_type'] = cancer_type
+            if user_id is not None:
+                event['user_id'] = str(user_id)
+        get_redis_connection('default').xadd(
+            settings.CHAT_MESSAGE_STREAM, event,
+            maxlen=settings.CHAT_MESSAGE_STREAM_MAXLEN, approximate=True
+        )
+    except Exception as e:
+        logger.warning(f"Publishing message event failed: {e}")
+
+
+def _template_set_version(qs):
+    """Version string that changes whenever a template in the set is added, edited or removed"""
+    stats = qs.aggregate(count=Count('id'), max_id=Max('id'), updated=Max('updated_at'))
+    updated = stats['updated'].isoformat() if stats['updated'] else ''
+    digest = hashlib.md5(f"{stats['count']}:{stats['max_id']}:{updated}".encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
 class ChatViewSet(viewsets.ViewSet):
 
+    def _visible_sessions(self, request):
+        # internal services (X-Service-Token) act on any session, e.g. suggestion precompute
+        if request.auth == 'service':
+            return ChatSession.objects.all()
+        return ChatSession.objects.filter(patient__user_id=request.user.id)   # <- change if your field names differ
+
     def _session_for_user_or_403(self, request, sid: str) -> ChatSession:
         if not sid:
             raise NotFound("session_id required")
 
         session = (
-            ChatSession.objects
+            self._visible_sessions(request)
             .select_related("patient")
-            .filter(id=sid, patient__user_id=request.user.id)   # <- change if your field names differ
+            .filter(id=sid)
             .first()
         )
         if not session:
@@ -1482,6 +1677,8 @@ class ChatViewSet(viewsets.ViewSet):
             return Response({'error': 'session_id, role, and content are required'}, status=400)
 
         msg = ChatMessage.objects.create(session_id=session_id, role=role, content=content)
+        _invalidate_suggestion_results(session_id)
+        _publish_message_persisted(msg)
         return Response(ChatMessageSerializer(msg).data)
 
     @action(detail=False, methods=['post'])
@@ -1533,9 +1730,45 @@ class ChatViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'], url_path='internal/suggestions/templates')
     def internal_templates(self, request):
         # templates are global; no ownership check
-        ct = (request.query_params.get('cancer_type') or '').strip().lower()
-        qs = SuggestionTemplate.objects.filter(cancer_type=ct) if ct else SuggestionTemplate.objects.all()
-        return Response(SuggestionTemplateSerializer(qs, many=True).data, status=200)
+        qs = _templates_for(request.query_params)
+        return Response(SuggestionTemplateSerializer(qs.order_by('id'), many=True).data, status=200)
+
+    @action(detail=False, methods=['get'], url_path='internal/suggestions/context')
+    def internal_suggestion_context(self, request):
+        """Last messages, suggested history and templates for one session in one round trip"""
+        sid = request.query_params.get('session_id')
+        if not sid:
+            raise NotFound("session_id required")
+        try:
+            limit = int(request.query_params.get('limit', 5))
+        except (TypeError, ValueError):
+            return Response({'error': 'limit must be an integer'}, status=400)
+        limit = max(1, min(limit, SUGGESTION_CONTEXT_MAX_MESSAGES))
+
+        # one session lookup; messages and history ride along as prefetches
+        session = (
+            self._visible_sessions(request)
+            .filter(id=sid)
+            .prefetch_related(
+                Prefetch('messages', queryset=ChatMessage.objects.order_by('-timestamp')[:limit], to_attr='recent_messages'),
+                Prefetch('suggested_history', queryset=SuggestedHistory.objects.only('session_id', 'text'), to_attr='history'),
+            )
+            .first()
+        )
+        if not session:
+            raise PermissionDenied("You do not have access to this session")
+
+        # skip the template payload when the caller already holds this version
+        qs = _templates_for(request.query_params)
+        version = _template_set_version(qs)
+        known = request.query_params.get('templates_version')
+        items = None if known == version else SuggestionTemplateSerializer(qs.order_by('id'), many=True).data
+
+        return Response({
+            'messages': ChatMessageSerializer(list(reversed(session.recent_messages)), many=True).data,
+            'history': [h.text for h in session.history],
+            'templates': {'version': version, 'items': items},
+        }, status=200)
 
     @action(detail=False, methods=['get', 'post'], url_path='internal/suggestions/history',
             permission_classes=[permissions.IsAuthenticated])
@@ -1553,6 +1786,7 @@ class ChatViewSet(viewsets.ViewSet):
         session = self._session_for_user_or_403(request, sid)
         objs = [SuggestedHistory(session=session, text=t) for t in items[:4]]
         SuggestedHistory.objects.bulk_create(objs, ignore_conflicts=True)  # unique_together(session,text)
+        _invalidate_suggestion_results(session.id)
         return Response({'success': True}, status=200)
 
     # Store last 4 on the session so the UI can reload them
@@ -1565,19 +1799,54 @@ class ChatViewSet(viewsets.ViewSet):
         session.save(update_fields=['suggestions'])
         return Response({'success': True}, status=200)
 
+    @action(detail=False, methods=['get'], url_path='internal/suggestions/stale-templates',
+            permission_classes=[IsAuthenticatedOrService])
+    def internal_stale_templates(self, request):
+        """Page of templates (by id) whose embedding is missing or from another model version"""
+        model_version = (request.query_params.get('model_version') or '').strip()
+        if not model_version:
+            return Response({'error': 'model_version is required'}, status=400)
+        after_id = int(request.query_params.get('after_id', 0))
+        limit = min(int(request.query_params.get('limit', 256)), 1000)
+
+        qs = SuggestionTemplate.needing_embedding(model_version).filter(id__gt=after_id)
+        if request.query_params.get('cancer_type') or request.query_params.get('cancer_type_name'):
+            qs = qs.filter(id__in=_templates_for(request.query_params).values('id'))
+        rows = list(qs.order_by('id').values('id', 'text')[:limit])
+        return Response(rows, status=200)
+
     @action(detail=False, methods=['post'], url_path='internal/suggestions/upsert-embeddings',
-            permission_classes=[permissions.IsAuthenticated])
+            permission_classes=[IsServiceOrAdmin])
     def internal_upsert_embeddings(self, request):
         items = request.data.get('items') or []  # [{id, embedding}]
+        model_version = request.data.get('model_version') or ''
         if not isinstance(items, list):
             return Response({'error':'items must be a list'}, status=400)
 
-        # (No session ownership required here; it’s template data.)
-        updated = 0
+        # Template vectors are shared by every session, so only the backfill (service or admin) writes them
+        dimensions = SuggestionTemplate._meta.get_field('embedding').dimensions
+        vectors = {}
         for it in items:
-            sid = it.get('id'); emb = it.get('embedding')
-            if sid is None or emb is None: 
+            if not isinstance(it, dict) or it.get('embedding') is None:
                 continue
-            SuggestionTemplate.objects.filter(id=sid).update(embedding_json=emb)
-            updated += 1
-        return Response({'updated': updated}, status=200)
+            try:
+                template_id = int(it.get('id'))
+            except (TypeError, ValueError):
+                return Response({'error': f"invalid template id: {it.get('id')!r}"}, status=400)
+            embedding = it['embedding']
+            if (not isinstance(embedding, list) or len(embedding) != dimensions
+                    or not all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in embedding)):
+                return Response({'error': f'embedding for template {template_id} must be {dimensions} floats'},
+                                status=400)
+            vectors[template_id] = embedding
+        templates = list(SuggestionTemplate.objects.filter(id__in=vectors.keys()).only('id'))
+        now = timezone.now()
+        for template in templates:
+            template.embedding = vectors[template.id]
+            template.embedding_model = model_version
+            template.updated_at = now
+        with transaction.atomic():
+            SuggestionTemplate.objects.bulk_update(
+                templates, ['embedding', 'embedding_model', 'updated_at'], batch_size=500
+            )
+        return Response({'updated': len(templates)}, status=200)
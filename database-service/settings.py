@@ -136,6 +136,21 @@ CORS_ALLOW_CREDENTIALS = True
 # Cache TTL settings
 CACHE_TTL = 60 * 15  # 15 minutes
 
+# RAG embedding bulk ingest: rows per multi-row INSERT statement
+RAG_BULK_INSERT_BATCH_SIZE = config('RAG_BULK_INSERT_BATCH_SIZE', default=500, cast=int)
+
+# RAG vector search recall knobs (per-request values override these)
+RAG_IVFFLAT_PROBES = config('RAG_IVFFLAT_PROBES', default=10, cast=int)
+RAG_HNSW_EF_SEARCH = config('RAG_HNSW_EF_SEARCH', default=40, cast=int)
+
+# Build parameters for the per-cancer-type partial HNSW indexes created on ingest
+RAG_HNSW_M = config('RAG_HNSW_M', default=16, cast=int)
+RAG_HNSW_EF_CONSTRUCTION = config('RAG_HNSW_EF_CONSTRUCTION', default=64, cast=int)
+
+# Redis stream announcing persisted chat messages (consumed by the suggestion service)
+CHAT_MESSAGE_STREAM = config('CHAT_MESSAGE_STREAM', default='chat:messages')
+CHAT_MESSAGE_STREAM_MAXLEN = config('CHAT_MESSAGE_STREAM_MAXLEN', default=10000, cast=int)
+
 # JWT Configuration (shared with auth service)
 JWT_SECRET_KEY = config('JWT_SECRET_KEY', default='your-secret-key-here')
 
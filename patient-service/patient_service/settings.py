@@ -178,6 +178,11 @@ if not DEBUG:
     CSRF_COOKIE_SECURE = True
 
 CTRANS_API_BASE = "http://translation-service:8010/api"
+# In-process LRU in front of the translation service's Redis cache (see patients/translation_cache.py)
+CTRANS_LRU_MAX_ENTRIES = config('CTRANS_LRU_MAX_ENTRIES', default=10000, cast=int)
+CTRANS_LRU_MAX_BYTES = config('CTRANS_LRU_MAX_BYTES', default=8 * 1024 * 1024, cast=int)
+# Service token for the translation service (used by the warm_translations command)
+TRANSLATION_SERVICE_TOKEN = config('TRANSLATION_SERVICE_TOKEN', default='')
 TEMPLATES[0]["OPTIONS"]["context_processors"] += [
     "django.template.context_processors.request",
 ]
@@ -0,0 +1,114 @@
+import re
+import time
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.utils import get_app_template_dirs
+from django.utils.text import unescape_string_literal
+
+# {% ctrans "Text" %} / {%ctrans 'Text' %} with a literal string argument
+CTRANS_TAG_RE = re.compile(r"""\{%\s*ctrans\s+("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')\s*%\}""")
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-translate every literal {% ctrans %} string found in the templates into "
+        "each supported language, so the translation cache already holds them when "
+        "pages are rendered."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--language",
+            action="append",
+            dest="languages",
+            help="Target language code; repeat for several (default: every LANGUAGES entry except LANGUAGE_CODE)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Texts sent per /translate/batch request (default: 500)",
+        )
+        parser.add_argument(
+            "--wait",
+            type=float,
+            default=300,
+            help="Seconds to wait for queued translations to complete; 0 to only enqueue (default: 300)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the strings found without calling the translation service",
+        )
+
+    def handle(self, *args, **opts):
+        texts = self._collect_texts()
+        self.stdout.write(f"Found {len(texts)} distinct ctrans strings")
+        if opts["dry_run"]:
+            for text in texts:
+                self.stdout.write(f"  {text}")
+            return
+        if not texts:
+            return
+
+        languages = opts["languages"] or [
+            code for code, _ in settings.LANGUAGES if code != settings.LANGUAGE_CODE
+        ]
+        for lang in languages:
+            done, pending = self._warm(texts, lang, opts["batch_size"], opts["wait"])
+            style = self.style.SUCCESS if not pending else self.style.WARNING
+            self.stdout.write(style(f"{lang}: {done} translated, {pending} still pending"))
+
+    def _template_files(self):
+        dirs = [Path(d) for engine in settings.TEMPLATES for d in engine.get("DIRS", [])]
+        dirs += [Path(d) for d in get_app_template_dirs("templates")]
+        for directory in dict.fromkeys(dirs):
+            if directory.is_dir():
+                yield from sorted(directory.rglob("*.html"))
+
+    def _collect_texts(self):
+        texts = {}
+        for path in self._template_files():
+            for literal in CTRANS_TAG_RE.findall(path.read_text(encoding="utf-8")):
+                texts.setdefault(unescape_string_literal(literal), None)
+        return list(texts)
+
+    def _submit(self, texts, lang):
+        base_url = getattr(settings, "CTRANS_API_BASE", "http://translation-service:8010/api")
+        response = requests.post(
+            f"{base_url}/translate/batch",
+            json={"texts": texts, "target_language": lang},
+            headers={"X-Service-Token": settings.TRANSLATION_SERVICE_TOKEN},
+            timeout=(2, 30),
+        )
+        if response.status_code == 401:
+            raise CommandError("Translation service rejected TRANSLATION_SERVICE_TOKEN")
+        response.raise_for_status()
+        return response.json().get("items", [])
+
+    def _warm(self, texts, lang, batch_size, wait):
+        """
+        Submits the texts until every one is completed (or failed) or the wait
+        runs out; resubmitting is cheap since finished texts are cache hits.
+        """
+        pending = list(texts)
+        done = 0
+        deadline = time.monotonic() + wait
+        while pending:
+            still_pending = []
+            for start in range(0, len(pending), batch_size):
+                for item in self._submit(pending[start:start + batch_size], lang):
+                    if item.get("status") == "completed":
+                        done += 1
+                    elif item.get("status") == "failed":
+                        self.stderr.write(f"{lang}: failed to translate {item.get('text')!r}: {item.get('result')}")
+                    else:
+                        still_pending.append(item.get("text"))
+            pending = still_pending
+            if not pending or time.monotonic() >= deadline:
+                break
+            time.sleep(2)
+        return done, len(pending)
@@ -4,15 +4,18 @@ import base64
 import json
 import logging
 import hashlib
+import re
+import secrets
 
 from django import template
 from django.conf import settings
 from django.utils.safestring import mark_safe
-from django.utils.html import format_html
+from django.utils.html import format_html, conditional_escape
 from django.utils.translation import gettext as _
 from django.core.cache import cache
 import requests
 
+from patients import translation_cache
 from patients.services import DatabaseService
 from patients.utils import auth_headers_from_request
 
@@ -115,6 +118,22 @@ def _submit_translation(text: str, target_code: str, request) -> dict:
     #return the JSON response from the API
     return response.json()
 
+def _submit_translation_batch(texts: list[str], target_code: str, request) -> dict:
+    """
+    Sends every collected text to the translation service's batch endpoint in one POST.
+    """
+    base_url = getattr(settings, "CTRANS_API_BASE", "http://translation-service:8010/api")
+    auth_headers = auth_headers_from_request(request)
+
+    response = requests.post(
+        f"{base_url}/translate/batch",
+        json={"texts": texts, "target_language": target_code},
+        headers=auth_headers,
+        timeout=(2, 6),
+    )
+    response.raise_for_status()
+    return response.json()
+
 def _resolve_lang_code(context) -> str:
     """
     Determine the target language code for the current user.
@@ -154,6 +173,11 @@ def ctrans(context, text: str):
     translation is not ready immediately, it renders a placeholder that a
     frontend script can update later.
     """
+    #inside {% ctrans_page %}: defer to the page-wide batch call
+    collector = context.get(_COLLECTOR_KEY)
+    if collector is not None:
+        return collector.add(text)
+
     request = context.get("request")
 
     #figure out the target language
@@ -163,6 +187,11 @@ def ctrans(context, text: str):
     if code == "en":
         return _(text)
 
+    #in-process LRU, then the translation service's Redis cache
+    cached = translation_cache.get(text, code)
+    if cached:
+        return cached
+
     #try to get a translation from the API
     #set pending lock to prevent other processess from duplicating 
     try:
@@ -176,6 +205,7 @@ def ctrans(context, text: str):
     if isinstance(data, dict) and data.get("status") == "completed":
         result = data.get("result")
         if result:
+            translation_cache.put(text, code, result)
             return result
         return _(text)
 
@@ -204,4 +234,96 @@ def _render_pending_placeholder(request_id: str | None, text: str) -> str:
         ),
         request_id,
         mark_safe(str(estimated_width)), # Mark as safe to render the style attribute
-    )
\ No newline at end of file
+    )
+# ---------------------------
+# Page-wide collection
+# ---------------------------
+_COLLECTOR_KEY = "_ctrans_collector"
+
+class _Collector:
+    """
+    Gathers the strings of every {% ctrans %} rendered inside {% ctrans_page %}.
+    Each tag renders a marker; once the page is rendered, all strings are sent
+    in a single batch request and the markers are swapped for their results.
+    """
+    def __init__(self, code: str):
+        self.code = code
+        self.texts: list[str] = []
+        self.slots: Dict[str, int] = {}
+        #random per render so page content can never forge a marker
+        nonce = secrets.token_hex(8)
+        self.marker = f"<!--ctrans:{nonce}:{{}}-->"
+        self.marker_re = re.compile(rf"<!--ctrans:{nonce}:(\d+)-->")
+
+    def add(self, text: str) -> str:
+        if self.code == "en":
+            return _(text)
+        slot = self.slots.get(text)
+        if slot is None:
+            slot = self.slots[text] = len(self.texts)
+            self.texts.append(text)
+        return mark_safe(self.marker.format(slot))
+
+    def resolve(self, request, autoescape: bool) -> list[str]:
+        """
+        Rendered HTML for each collected text, in collection order.
+        """
+        escape = conditional_escape if autoescape else str
+        fallback = [escape(_(text)) for text in self.texts]
+        #only strings missing from both cache tiers go to the translation service
+        cached = translation_cache.get_many(self.texts, self.code)
+        missing = [text for text in self.texts if text not in cached]
+        by_text = {}
+        if missing:
+            try:
+                data = _submit_translation_batch(missing, self.code, request)
+                by_text = {item.get("text"): item for item in (data or {}).get("items", [])}
+            except Exception as e:
+                logger.warning("ctrans: batch submit failed (%s); falling back", e)
+
+        rendered = []
+        for text, default in zip(self.texts, fallback):
+            item = by_text.get(text) or {}
+            if text in cached:
+                rendered.append(escape(cached[text]))
+            #Case A: completed translation (cache hit on the service's side)
+            elif item.get("status") == "completed" and item.get("result"):
+                translation_cache.put(text, self.code, item["result"])
+                rendered.append(escape(item["result"]))
+            #Case B: queued by this request, render the placeholder
+            elif item.get("request_id"):
+                rendered.append(_render_pending_placeholder(request_id=item["request_id"], text=text))
+            else:
+                rendered.append(default)
+        return rendered
+
+class CtransPageNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        #already collecting for an enclosing block
+        if context.get(_COLLECTOR_KEY) is not None:
+            return self.nodelist.render(context)
+
+        collector = _Collector(_resolve_lang_code(context))
+        with context.push({_COLLECTOR_KEY: collector}):
+            output = self.nodelist.render(context)
+        if not collector.texts:
+            return output
+
+        rendered = collector.resolve(context.get("request"), context.autoescape)
+        return mark_safe(collector.marker_re.sub(lambda m: rendered[int(m.group(1))], output))
+
+@register.tag
+def ctrans_page(parser, token):
+    """
+    Batches every {% ctrans %} inside the block into one translation request.
+    Usage: {% ctrans_page %} ... {% endctrans_page %}
+
+    The user's language is resolved once for the whole block instead of once
+    per string, and the translation service is called once per render.
+    """
+    nodelist = parser.parse(("endctrans_page",))
+    parser.delete_first_token()
+    return CtransPageNode(nodelist)
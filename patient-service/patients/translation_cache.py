@@ -0,0 +1,166 @@
+"""
+Two-tier cache for completed {% ctrans %} translations.
+
+Tier 1 is an in-process LRU bounded by entry count and by bytes, so steady-state
+page renders need no network calls at all. Tier 2 reads the translation
+service's own Redis cache directly (read-through): keys are built exactly like
+``get_translation_cache_key`` in the translation service, so anything that
+service has ever completed is one MGET away. Only completed translations are
+cached; pending jobs are left to the translation service.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+import redis
+
+logger = logging.getLogger(__name__)
+
+#must match TRANSLATION_CACHE_PREFIX in the translation service
+TRANSLATION_CACHE_PREFIX = "translation_cache:"
+#after a Redis error, skip the Redis tier for this long instead of timing out on every render
+REDIS_RETRY_SECONDS = 30
+
+def cache_key(text: str, lang: str) -> str:
+    """
+    Same key as the translation service's get_translation_cache_key().
+    """
+    key_hash = hashlib.sha256(f"{text}:{lang}".encode("utf-8")).hexdigest()
+    return f"{TRANSLATION_CACHE_PREFIX}{key_hash}"
+
+class _LRU:
+    """
+    Thread-safe LRU of cache key -> translated text, bounded by entries and bytes.
+    """
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[str, str] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _size(key: str, value: str) -> int:
+        return len(key) + len(value.encode("utf-8"))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.counters["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        size = self._size(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size(key, old)
+            self._data[key] = value
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                evicted_key, evicted = self._data.popitem(last=False)
+                self._bytes -= self._size(evicted_key, evicted)
+                self.counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._data), "bytes": self._bytes}
+
+_lru = _LRU(
+    max_entries=getattr(settings, "CTRANS_LRU_MAX_ENTRIES", 10000),
+    max_bytes=getattr(settings, "CTRANS_LRU_MAX_BYTES", 8 * 1024 * 1024),
+)
+_redis: Optional[redis.Redis] = None
+_redis_down_until = 0.0
+
+def _get_redis() -> Optional[redis.Redis]:
+    global _redis
+    if time.monotonic() < _redis_down_until:
+        return None
+    if _redis is None:
+        _redis = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            decode_responses=True,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5,
+        )
+    return _redis
+
+def _redis_failed(e: Exception) -> None:
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+    logger.warning("ctrans cache: Redis unavailable (%s); skipping it for %ss", e, REDIS_RETRY_SECONDS)
+
+def get_many(texts: Iterable[str], lang: str) -> Dict[str, str]:
+    """
+    Completed translations for whichever texts are cached, from the LRU first
+    and then a single Redis MGET for the rest (which also fills the LRU).
+    """
+    found: Dict[str, str] = {}
+    missing: Dict[str, str] = {}
+    for text in texts:
+        key = cache_key(text, lang)
+        value = _lru.get(key)
+        if value is not None:
+            found[text] = value
+        else:
+            missing[key] = text
+    if not missing:
+        return found
+
+    client = _get_redis()
+    if client is None:
+        return found
+    try:
+        values = client.mget(list(missing))
+    except redis.RedisError as e:
+        _redis_failed(e)
+        return found
+
+    for (key, text), raw in zip(missing.items(), values):
+        if raw is None:
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            continue
+        if data.get("status") == "completed" and data.get("result"):
+            _lru.put(key, data["result"])
+            found[text] = data["result"]
+    return found
+
+def get(text: str, lang: str) -> Optional[str]:
+    return get_many([text], lang).get(text)
+
+def put(text: str, lang: str, result: str) -> None:
+    """
+    Remember a completed translation returned by the translation service.
+    """
+    if result:
+        _lru.put(cache_key(text, lang), result)
+
+def clear() -> None:
+    _lru.clear()
+
+def stats() -> dict:
+    return _lru.stats()
@@ -1,8 +1,14 @@
 """Document processing logic for embeddings"""
 import os
+import time
+import random
+import hashlib
 import logging
 import requests
-from typing import Dict, Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Callable, Optional, List, Iterator, Tuple
+import openai
+from pypdf import PdfReader
 from django.conf import settings
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -47,24 +53,19 @@ class DocumentProcessor:
             # Get filename
             filename = self._get_filename(document_id)
             
-            # Load and split document
-            chunks = self._load_and_split_document(
-                temp_file_path, filename, job_id, progress_callback
-            )
-            
-            # Generate embeddings and save
-            self._process_chunks(
-                chunks, document_id, cancer_type_id, 
+            # Stream pages -> chunks -> embeddings -> database in bounded batches
+            total_chunks = self._process_document_streaming(
+                temp_file_path, document_id, cancer_type_id,
                 filename, job_id, progress_callback
             )
             
             # Final update
             progress_callback(job_id, 'completed', 
-                            f'Successfully processed {len(chunks)} chunks',
+                            f'Successfully processed {total_chunks} chunks',
                             {
                                 'phase': 'completed',
-                                'total_chunks': len(chunks),
-                                'processed_chunks': len(chunks),
+                                'total_chunks': total_chunks,
+                                'processed_chunks': total_chunks,
                                 'percentage': 100
                             })
             
@@ -111,64 +112,86 @@ class DocumentProcessor:
             pass
         return 'unknown.pdf'
     
-    def _load_and_split_document(self, file_path: str, filename: str, 
-                                job_id: str, progress_callback: Callable) -> list:
-        """Load PDF and split into chunks"""
-        # Update progress
+    def _get_last_chunk_index(self, document_id: str) -> int:
+        """Highest chunk_index already committed for the document, or -1"""
+        headers = {'X-Service-Token': settings.DATABASE_SERVICE_TOKEN}
+        response = requests.get(
+            f"{settings.DATABASE_SERVICE_URL}/api/rag/embeddings/last_chunk_index/",
+            headers=headers,
+            params={'document_id': document_id}
+        )
+        if response.status_code != 200:
+            raise ExternalServiceError(
+                f"Failed to read ingestion progress: {response.text}",
+                details={'document_id': document_id, 'status': response.status_code}
+            )
+        last_index = response.json().get('last_chunk_index')
+        return -1 if last_index is None else last_index
+
+    def _iter_chunks(self, file_path: str, filename: str) -> Iterator[Tuple[int, Any]]:
+        """
+        Lazily load the PDF one page at a time and yield (page_number, chunk).
+        The splitter works per page, so this produces the same chunks in the
+        same order as splitting the fully loaded document.
+        """
+        loader = PyPDFLoader(file_path)
+        for page_number, page in enumerate(loader.lazy_load(), start=1):
+            page.metadata['filename'] = filename
+            page.metadata['source'] = filename
+            for chunk in self.text_splitter.split_documents([page]):
+                yield page_number, chunk
+
+    def _process_document_streaming(self, file_path: str, document_id: str,
+                                    cancer_type_id: int, filename: str,
+                                    job_id: str, progress_callback: Callable) -> int:
+        """
+        Split, embed and persist the document in batches of RAG_INGEST_FLUSH_SIZE
+        chunks so memory stays bounded. Each flush is committed atomically by the
+        database service, so a restarted job resumes after the last committed
+        chunk_index instead of re-embedding the whole document.
+        """
         progress_callback(job_id, 'processing', 'Loading document', {
             'phase': 'loading',
             'total_chunks': 0,
             'processed_chunks': 0,
             'percentage': 0
         })
-        
-        # Load document
-        loader = PyPDFLoader(file_path)
-        documents = loader.load()
-        
-        # Add filename to metadata
-        for doc in documents:
-            doc.metadata['filename'] = filename
-            doc.metadata['source'] = filename
-        
-        # Update progress
-        progress_callback(job_id, 'processing', 'Splitting document into chunks', {
-            'phase': 'splitting',
-            'total_chunks': 0,
-            'processed_chunks': 0,
-            'percentage': 10
-        })
-        
-        # Split documents
-        chunks = self.text_splitter.split_documents(documents)
-        
-        logger.info(f"Split document into {len(chunks)} chunks")
-        return chunks
-    
-    def _process_chunks(self, chunks: list, document_id: str, 
-                       cancer_type_id: int, filename: str,
-                       job_id: str, progress_callback: Callable):
-        """Process chunks and save embeddings"""
-        # Update progress
-        progress_callback(job_id, 'processing', 
-                         f'Generating embeddings for {len(chunks)} chunks', {
-                             'phase': 'embedding',
-                             'total_chunks': len(chunks),
-                             'processed_chunks': 0,
-                             'percentage': 20
-                         })
-        
-        # Process chunks
-        chunk_data = []
-        for i, chunk in enumerate(chunks):
-            # Generate embedding
-            embedding = self.embeddings_model.embed_query(chunk.page_content)
-            
-            chunk_data.append({
+
+        total_pages = max(1, len(PdfReader(file_path).pages))
+        resume_after = self._get_last_chunk_index(document_id)
+        if resume_after >= 0:
+            logger.info(f"Resuming job {job_id} after chunk {resume_after}")
+
+        pending = []
+        chunk_index = -1
+        current_page = 0
+
+        def flush():
+            already_saved = pending[0][0]
+
+            # Progress while the batches embed also keeps the job's lease alive
+            def on_batch_done(embedded: int, to_embed: int):
+                progress_callback(
+                    job_id, 'processing',
+                    f'Embedded {embedded} of {to_embed} new chunks (page {current_page} of {total_pages})',
+                    {
+                        'phase': 'embedding',
+                        'total_chunks': already_saved + len(pending),
+                        'processed_chunks': already_saved,
+                        'percentage': 10 + int((current_page / total_pages) * 85)
+                    }
+                )
+
+            hashes = [self._content_hash(chunk.page_content) for _, chunk in pending]
+            embeddings = self._embed_or_reuse(
+                [chunk.page_content for _, chunk in pending], hashes, on_batch_done
+            )
+            chunk_data = [{
                 'document_id': document_id,
                 'cancer_type_id': cancer_type_id,
-                'chunk_index': i,
+                'chunk_index': index,
                 'chunk_text': chunk.page_content,
+                'content_hash': content_hash,
                 'embedding': embedding,
                 'metadata': {
                     'page': chunk.metadata.get('page', 0),
@@ -176,31 +199,122 @@ class DocumentProcessor:
                     'filename': filename,
                     'job_id': job_id
                 }
-            })
-            
-            # Update progress for every 10 chunks or last chunk
-            if (i + 1) % 10 == 0 or i == len(chunks) - 1:
-                progress_percentage = 20 + int(((i + 1) / len(chunks)) * 60)
-                progress_callback(
-                    job_id, 'processing',
-                    f'Processing chunk {i + 1} of {len(chunks)}',
-                    {
-                        'phase': 'embedding',
-                        'total_chunks': len(chunks),
-                        'processed_chunks': i + 1,
-                        'percentage': progress_percentage
-                    }
-                )
+            } for (index, chunk), content_hash, embedding in zip(pending, hashes, embeddings)]
+            self._save_embeddings(document_id, chunk_data)
+
+            saved = pending[-1][0] + 1
+            progress_callback(
+                job_id, 'processing',
+                f'Saved {saved} chunks (page {current_page} of {total_pages})',
+                {
+                    'phase': 'embedding',
+                    'total_chunks': saved,
+                    'processed_chunks': saved,
+                    'percentage': 10 + int((current_page / total_pages) * 85)
+                }
+            )
+            pending.clear()
+
+        for current_page, chunk in self._iter_chunks(file_path, filename):
+            chunk_index += 1
+            if chunk_index <= resume_after:
+                continue
+            pending.append((chunk_index, chunk))
+            if len(pending) >= settings.RAG_INGEST_FLUSH_SIZE:
+                flush()
+
+        if pending:
+            flush()
+
+        total_chunks = chunk_index + 1
+        logger.info(f"Processed {total_chunks} chunks for document {document_id}")
+        return total_chunks
+
+    def _content_hash(self, text: str) -> str:
+        """Identify chunk text together with everything that shapes its embedding"""
+        key = (
+            f"{settings.OPENAI_EMBEDDING_MODEL}|{settings.RAG_CHUNK_SIZE}|"
+            f"{settings.RAG_CHUNK_OVERLAP}|{text}"
+        )
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+    
+    def _lookup_embeddings(self, hashes: List[str]) -> Dict[str, List[float]]:
+        """Fetch vectors the database already holds for these content hashes"""
+        try:
+            headers = {'X-Service-Token': settings.DATABASE_SERVICE_TOKEN}
+            response = requests.post(
+                f"{settings.DATABASE_SERVICE_URL}/api/rag/embeddings/lookup_hashes/",
+                headers=headers,
+                json={'hashes': sorted(set(hashes))}
+            )
+            if response.status_code == 200:
+                return response.json().get('embeddings', {})
+            logger.warning(f"Embedding hash lookup failed: {response.text}")
+        except requests.RequestException as e:
+            logger.warning(f"Embedding hash lookup failed: {str(e)}")
+        return {}
+    
+    def _embed_or_reuse(self, texts: List[str], hashes: List[str],
+                        on_batch_done: Optional[Callable[[int, int], None]] = None) -> List[List[float]]:
+        """Embed only texts whose content hash has no stored vector yet"""
+        known = self._lookup_embeddings(hashes)
         
-        # Save to database
-        progress_callback(job_id, 'processing', 'Saving embeddings to database', {
-            'phase': 'saving',
-            'total_chunks': len(chunks),
-            'processed_chunks': len(chunks),
-            'percentage': 90
-        })
+        # Identical texts within the batch are embedded once as well
+        missing = {}
+        for text, content_hash in zip(texts, hashes):
+            if content_hash not in known:
+                missing.setdefault(content_hash, text)
+        
+        if missing:
+            fresh = self._embed_texts(list(missing.values()), on_batch_done)
+            known.update(zip(missing.keys(), fresh))
+        
+        logger.info(f"Reused {len(texts) - len(missing)} of {len(texts)} chunk embeddings")
+        return [known[content_hash] for content_hash in hashes]
+    
+    def _embed_texts(self, texts: List[str],
+                     on_batch_done: Optional[Callable[[int, int], None]] = None) -> List[List[float]]:
+        """
+        Embed texts with embed_documents in batches of RAG_EMBEDDING_BATCH_SIZE,
+        running up to RAG_EMBEDDING_CONCURRENCY batches at once. Results keep
+        the input order; on_batch_done receives the running count of embedded
+        texts and the total.
+        """
+        batch_size = settings.RAG_EMBEDDING_BATCH_SIZE
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results: List[Optional[List[List[float]]]] = [None] * len(batches)
+        done = 0
+        
+        with ThreadPoolExecutor(max_workers=settings.RAG_EMBEDDING_CONCURRENCY) as executor:
+            futures = {
+                executor.submit(self._embed_batch_with_retry, batch): index
+                for index, batch in enumerate(batches)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                done += len(batches[index])
+                if on_batch_done:
+                    on_batch_done(done, len(texts))
         
-        self._save_embeddings(document_id, chunk_data)
+        return [embedding for batch in results for embedding in batch]
+    
+    def _embed_batch_with_retry(self, batch: List[str]) -> List[List[float]]:
+        """Embed one batch, backing off exponentially on rate limits and transient errors"""
+        attempt = 0
+        while True:
+            try:
+                return self.embeddings_model.embed_documents(batch)
+            except (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError) as e:
+                attempt += 1
+                if attempt > settings.RAG_EMBEDDING_MAX_RETRIES:
+                    raise ProcessingError(
+                        f"Embedding batch failed after {attempt - 1} retries: {str(e)}",
+                        details={'batch_size': len(batch)}
+                    )
+                delay = min(60, (2 ** attempt) + random.uniform(0, 1))
+                logger.warning(f"Embedding batch rate limited or failed ({str(e)}); retrying in {delay:.1f}s")
+                time.sleep(delay)
     
     def _save_embeddings(self, document_id: str, chunk_data: list):
         """Save embeddings to database via database service"""
@@ -0,0 +1,125 @@
+"""Content-addressed cache for query embeddings"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+import redis
+from django.conf import settings
+from langchain_openai import OpenAIEmbeddings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace and case so near-identical questions share an entry"""
+    return ' '.join(text.split()).casefold()
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """Key an embedding by model name plus normalized text"""
+    digest = hashlib.sha256(f"{model_name}\n{normalize_query(text)}".encode('utf-8')).hexdigest()
+    return f"rag:query-embedding:{digest}"
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: an in-process LRU in front of Redis.
+    Both tiers hold vectors as packed float32 bytes (6 KB for 1536 dimensions
+    instead of ~50 KB as a list of Python floats); the LRU is bounded by the
+    total size of those bytes.
+    """
+
+    def __init__(self, max_bytes: int, ttl: int):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = OrderedDict()
+        self._local_bytes = 0
+        self._lock = threading.Lock()
+        self.redis_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            db=settings.REDIS_DB
+        )
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            raw = self._local.get(key)
+            if raw is not None:
+                self._local.move_to_end(key)
+        if raw is not None:
+            return np.frombuffer(raw, dtype=np.float32).tolist()
+
+        try:
+            raw = self.redis_client.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Embedding cache read failed: {str(e)}")
+            return None
+        if raw is None:
+            return None
+
+        self._remember(key, raw)
+        return np.frombuffer(raw, dtype=np.float32).tolist()
+
+    def set(self, key: str, vector: List[float]):
+        raw = np.asarray(vector, dtype=np.float32).tobytes()
+        self._remember(key, raw)
+        try:
+            self.redis_client.setex(key, self.ttl, raw)
+        except redis.RedisError as e:
+            logger.warning(f"Embedding cache write failed: {str(e)}")
+
+    def _remember(self, key: str, raw: bytes):
+        with self._lock:
+            previous = self._local.pop(key, None)
+            if previous is not None:
+                self._local_bytes -= len(previous)
+            self._local[key] = raw
+            self._local_bytes += len(raw)
+            while self._local_bytes > self.max_bytes and self._local:
+                _, evicted = self._local.popitem(last=False)
+                self._local_bytes -= len(evicted)
+
+
+_embeddings_model = None
+_cache = None
+_init_lock = threading.Lock()
+
+
+def get_embeddings_model() -> OpenAIEmbeddings:
+    """Shared OpenAI embeddings client (one per process)"""
+    global _embeddings_model
+    if _embeddings_model is None:
+        with _init_lock:
+            if _embeddings_model is None:
+                _embeddings_model = OpenAIEmbeddings(
+                    openai_api_key=settings.OPENAI_API_KEY,
+                    model=settings.OPENAI_EMBEDDING_MODEL
+                )
+    return _embeddings_model
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        with _init_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    max_bytes=settings.RAG_QUERY_EMBEDDING_CACHE_BYTES,
+                    ttl=settings.RAG_QUERY_EMBEDDING_CACHE_TTL
+                )
+    return _cache
+
+
+def get_query_embedding(query: str) -> List[float]:
+    """Embed a query, serving repeats from the cache instead of the OpenAI API"""
+    cache = get_embedding_cache()
+    key = cache_key(settings.OPENAI_EMBEDDING_MODEL, query)
+
+    vector = cache.get(key)
+    if vector is not None:
+        return vector
+
+    vector = get_embeddings_model().embed_query(query)
+    cache.set(key, vector)
+    return vector
@@ -46,4 +46,9 @@ class ExternalServiceError(RAGServiceException):
 class QueueError(RAGServiceException):
     """Queue operation errors"""
     status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-    default_message = "Queue operation failed"
\ No newline at end of file
+    default_message = "Queue operation failed"
+
+
+class LeaseLostError(QueueError):
+    """The job's lease expired and another worker has claimed it"""
+    default_message = "Job lease lost to another worker"
@@ -1,9 +1,10 @@
 """Simplified LangChain integration for RAG responses"""
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Tuple
 from langchain.schema import Document, BaseRetriever
 from langchain_openai import ChatOpenAI
-from langchain.chains import RetrievalQA
+from langchain.chains.question_answering import load_qa_chain
 from langchain.callbacks.manager import CallbackManagerForRetrieverRun
 from langchain.prompts import PromptTemplate
 from langchain_core.messages import HumanMessage, AIMessage
@@ -47,8 +48,16 @@ class CustomRetriever(BaseRetriever):
         self, query: str, *, run_manager: Optional[CallbackManagerForRetrieverRun] = None
     ) -> List[Document]:
         """Retrieve relevant documents for a query"""
+        documents, _ = self.retrieve(query, self.k)
+        return documents
+    
+    def retrieve(self, query: str, k: int) -> Tuple[List[Document], List[Dict[str, Any]]]:
+        """
+        Run one vector search and return both the deduplicated documents for
+        the LLM context and the raw search results they were built from.
+        """
         # Get more results initially for better filtering
-        results = query_embeddings(query, self.cancer_type_id, self.k * 2)
+        results = query_embeddings(query, self.cancer_type_id, k * 2)
         
         # Convert to LangChain documents with deduplication
         documents = []
@@ -72,10 +81,10 @@ class CustomRetriever(BaseRetriever):
             documents.append(doc)
             
             # Stop when we have enough unique documents
-            if len(documents) >= self.k:
+            if len(documents) >= k:
                 break
         
-        return documents
+        return documents, results
     
     @staticmethod
     def _extract_metadata(result: dict) -> dict:
@@ -97,43 +106,43 @@ class CustomRetriever(BaseRetriever):
 
 
 class RAGChain:
-    """Simplified RAG chain wrapper"""
+    """
+    Simplified RAG chain wrapper. Instances are long-lived: one per
+    (cancer_type_id, model_name, language), obtained via get_rag_chain().
+    """
     
     def __init__(self, cancer_type_id: Optional[int] = None,
                  model_name: str = "gpt-3.5-turbo",
-                 k: int = 10):
+                 language: str = 'English'):
         self.llm = ChatOpenAI(
             model_name=model_name,
             temperature=0,
             openai_api_key=settings.OPENAI_API_KEY,
             max_tokens=500
         )
-        self.retriever = CustomRetriever(cancer_type_id=cancer_type_id, k=k)
-        self.prompt_template = MEDICAL_QA_PROMPT
-        self.qa_chain = None
+        self.retriever = CustomRetriever(cancer_type_id=cancer_type_id)
+        self.prompt_template = MEDICAL_QA_PROMPT.partial(language=language)
+        self.qa_chain = self._create_chain(self.prompt_template)
     
     def _create_chain(self, prompt: PromptTemplate):
-        """Create the QA chain"""
-        return RetrievalQA.from_chain_type(
+        """Create the chain that stuffs retrieved documents into the prompt"""
+        return load_qa_chain(
             llm=self.llm,
             chain_type="stuff",
-            retriever=self.retriever,
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": prompt,
-                               "document_variable_name": "context"}
+            prompt=prompt,
+            document_variable_name="context"
         )
     
-    def query(self, question: str, chat_history: List = None, language: str = 'English') -> Dict[str, Any]:
+    def query(self, question: str, chat_history: List = None, k: int = 10) -> Dict[str, Any]:
         """Process a query with optional chat history"""
-        # Add chat history context if available
-        prompt = self.prompt_template.partial(language=language)
-
-        self.qa_chain = self._create_chain(prompt)
-        full_query = self._build_query_with_history(question, chat_history, language)
+        full_query = self._build_query_with_history(question, chat_history)
+        
+        # Single retrieval pass shared by the LLM context and raw_results
+        source_documents, raw_results = self.retriever.retrieve(full_query, k)
         
         # Run the chain
         try:
-            result = self.qa_chain.invoke({"query": full_query})
+            result = self.qa_chain.invoke({"input_documents": source_documents, "question": full_query})
             logger.debug(f"Chain result type: {type(result)}, keys: {result.keys() if isinstance(result, dict) else 'N/A'}")
         except Exception as e:
             logger.error(f"Chain invoke failed: {e}")
@@ -141,13 +150,18 @@ class RAGChain:
         
         # Ensure result is a dict
         if isinstance(result, str):
-            result = {"result": result, "source_documents": []}
+            result = {"output_text": result}
         
         # Extract and format respons
-        return self._format_response(result, question)
+        response = self._format_response(
+            {"result": result.get("output_text"), "source_documents": source_documents},
+            question
+        )
+        response['raw_results'] = raw_results
+        return response
     
     @staticmethod
-    def _build_query_with_history(question: str, chat_history: List, language: str) -> str:
+    def _build_query_with_history(question: str, chat_history: List) -> str:
         """Build query with chat history context"""
         if not chat_history:
             return question
@@ -184,7 +198,7 @@ class RAGChain:
     @staticmethod
     def _format_response(result: dict, original_query: str) -> Dict[str, Any]:
         """Format the chain response"""
-        answer = result.get("result", "I couldn't generate a response.")
+        answer = result.get("result") or "I couldn't generate a response."
         source_documents = result.get("source_documents", [])
         
         # Extract unique sources
@@ -220,17 +234,34 @@ class RAGChain:
         }
 
 
+_chain_registry: Dict[Tuple[Optional[int], str, str], RAGChain] = {}
+_chain_registry_lock = threading.Lock()
+
+
+def get_rag_chain(cancer_type_id: Optional[int] = None,
+                  model_name: str = "gpt-3.5-turbo",
+                  language: str = 'English') -> RAGChain:
+    """Return the per-process chain for this cancer type, model and language"""
+    key = (cancer_type_id, model_name, language)
+    chain = _chain_registry.get(key)
+    if chain is None:
+        with _chain_registry_lock:
+            chain = _chain_registry.get(key)
+            if chain is None:
+                chain = RAGChain(cancer_type_id=cancer_type_id, model_name=model_name, language=language)
+                _chain_registry[key] = chain
+    return chain
+
+
 def process_rag_query(query: str, cancer_type_id: Optional[int] = None,
                      chat_history: List = None, k: int = 10, language: str = 'English') -> Dict[str, Any]:
     """Main entry point for processing RAG queries"""
     try:
-        # Create and run chain
-        rag_chain = RAGChain(cancer_type_id=cancer_type_id, k=max(k, 8))
-        
-        result = rag_chain.query(query, chat_history, language)
+        # Reuse the long-lived chain; retrieval runs once and also feeds raw_results
+        rag_chain = get_rag_chain(cancer_type_id=cancer_type_id, language=language)
         
-        # Add raw results for compatibility
-        result['raw_results'] = query_embeddings(query, cancer_type_id, k)
+        result = rag_chain.query(query, chat_history, k=max(k, 8))
+        result['raw_results'] = result['raw_results'][:k]
         
         return result
         
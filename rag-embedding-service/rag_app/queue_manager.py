@@ -4,21 +4,104 @@ import logging
 import threading
 import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import redis
 import requests
 from django.conf import settings
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
-from .exceptions import QueueError, ProcessingError
+from .exceptions import QueueError, ProcessingError, LeaseLostError
 from .document_processor import DocumentProcessor
 
 logger = logging.getLogger(__name__)
 
 
+# Leases are stored as "<claim id>|<deadline>". The claim id comes from a counter
+# bumped on every claim, so a worker whose lease expired (and whose job was then
+# claimed again) can no longer extend or acknowledge the new holder's lease.
+
+# Move one job from the queue to the in-flight list and lease it, but only while
+# the cluster-wide in-flight count is below the limit. Runs atomically in Redis.
+# Returns {job_id, claim_id}.
+CLAIM_SCRIPT = """
+if redis.call('LLEN', KEYS[2]) >= tonumber(ARGV[1]) then
+    return false
+end
+local job_id = redis.call('RPOPLPUSH', KEYS[1], KEYS[2])
+if not job_id then
+    return false
+end
+local claim_id = tostring(redis.call('INCR', KEYS[4]))
+redis.call('HSET', KEYS[3], job_id, claim_id .. '|' .. ARGV[2])
+return {job_id, claim_id}
+"""
+
+# Push the lease deadline out, only if the caller still holds the claim
+EXTEND_LEASE_SCRIPT = """
+local lease = redis.call('HGET', KEYS[1], ARGV[1])
+if not lease or string.match(lease, '^([^|]*)|') ~= ARGV[2] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2] .. '|' .. ARGV[3])
+return 1
+"""
+
+# Remove a finished job from the in-flight list, only if the caller still holds the claim
+ACK_SCRIPT = """
+local lease = redis.call('HGET', KEYS[2], ARGV[1])
+if not lease or string.match(lease, '^([^|]*)|') ~= ARGV[2] then
+    return 0
+end
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('LREM', KEYS[1], 1, ARGV[1])
+return 1
+"""
+
+# Record a failed attempt and schedule its retry, only if the caller still holds the claim
+SCHEDULE_RETRY_SCRIPT = """
+local lease = redis.call('HGET', KEYS[1], ARGV[1])
+if not lease or string.match(lease, '^([^|]*)|') ~= ARGV[2] then
+    return 0
+end
+redis.call('SETEX', KEYS[2], ARGV[3], ARGV[4])
+redis.call('ZADD', KEYS[3], ARGV[5], ARGV[1])
+return 1
+"""
+
+# Return a job to the queue if its lease is still expired (the worker died or stalled)
+REQUEUE_EXPIRED_SCRIPT = """
+local lease = redis.call('HGET', KEYS[3], ARGV[1])
+if not lease then
+    return 0
+end
+local deadline = string.match(lease, '|(.+)$') or lease
+if tonumber(deadline) <= tonumber(ARGV[2]) then
+    redis.call('HDEL', KEYS[3], ARGV[1])
+    redis.call('LREM', KEYS[2], 0, ARGV[1])
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+def _lease_deadline(lease: str) -> float:
+    return float(lease.rsplit('|', 1)[-1])
+
+
 class RedisQueueManager:
-    """Manages job queue using Redis"""
+    """
+    Manages the embedding job queue using Redis as a reliable queue.
+    
+    Jobs are claimed by atomically moving them from the queue list to an
+    in-flight list with a lease deadline and a claim id. Workers extend the
+    lease while they report progress and remove the job when done, both only
+    while their claim id still matches; leases that expire (crashed or stuck
+    workers) are re-queued by any process, and a stalled worker that finds
+    its claim taken over stops working on the job. Use get_queue_manager()
+    rather than instantiating this directly so each process runs one pool.
+    """
     
     def __init__(self):
         self.redis_client = redis.Redis.from_url(
@@ -27,19 +110,42 @@ class RedisQueueManager:
             decode_responses=True
         )
         self.queue_key = "rag:embedding:queue"
-        self.processing_key = "rag:embedding:processing"
+        self.inflight_key = "rag:embedding:inflight"
+        self.leases_key = "rag:embedding:leases"
+        self.claim_seq_key = "rag:embedding:claim_seq"
+        self.delayed_key = "rag:embedding:delayed"
+        self.enqueued_key = "rag:embedding:enqueued"
+        self.metrics_key = "rag:embedding:metrics"
         self.status_key_prefix = "rag:embedding:status:"
-        self.worker_thread = None
         self.channel_layer = get_channel_layer()
-        self.document_processor = DocumentProcessor()
-        self.start_worker()
+        self.worker_threads: List[threading.Thread] = []
+        self._active_jobs: Dict[str, str] = {}  # job_id -> claim_id held by this process
+        self._active_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._claim = self.redis_client.register_script(CLAIM_SCRIPT)
+        self._extend = self.redis_client.register_script(EXTEND_LEASE_SCRIPT)
+        self._ack_script = self.redis_client.register_script(ACK_SCRIPT)
+        self._schedule_retry = self.redis_client.register_script(SCHEDULE_RETRY_SCRIPT)
+        self._requeue_expired = self.redis_client.register_script(REQUEUE_EXPIRED_SCRIPT)
     
-    def start_worker(self):
-        """Start background worker thread"""
-        if not self.worker_thread or not self.worker_thread.is_alive():
-            self.worker_thread = threading.Thread(target=self._process_queue, daemon=True)
-            self.worker_thread.start()
-            logger.info("Started embedding queue worker thread")
+    def start_workers(self):
+        """Start the configured number of worker threads for this process"""
+        self.worker_threads = [t for t in self.worker_threads if t.is_alive()]
+        for i in range(len(self.worker_threads), settings.RAG_WORKER_CONCURRENCY):
+            thread = threading.Thread(
+                target=self._process_queue,
+                name=f"rag-embedding-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self.worker_threads.append(thread)
+        logger.info(f"Started {len(self.worker_threads)} embedding queue worker thread(s)")
+    
+    def stop_workers(self, timeout: Optional[float] = None):
+        """Ask worker threads to exit after their current job"""
+        self._stop_event.set()
+        for thread in self.worker_threads:
+            thread.join(timeout)
     
     def add_job(self, job_data: Dict[str, Any]) -> str:
         """Add job to queue"""
@@ -57,63 +163,123 @@ class RedisQueueManager:
         )
         
         # Add to queue
-        self.redis_client.rpush(self.queue_key, job_id)
+        self._enqueue(job_id)
         logger.info(f"Added job {job_id} to embedding queue")
         
         return job_id
     
+    def _enqueue(self, job_id: str):
+        pipe = self.redis_client.pipeline()
+        pipe.hset(self.enqueued_key, job_id, time.time())
+        pipe.lpush(self.queue_key, job_id)
+        pipe.execute()
+    
     def _process_queue(self):
         """Background worker to process queue"""
-        while True:
+        document_processor = DocumentProcessor()
+        last_reap = 0.0
+        while not self._stop_event.is_set():
             try:
-                job_id = self._get_next_job()
-                if job_id:
-                    self._process_single_job(job_id)
+                if time.monotonic() - last_reap >= settings.RAG_QUEUE_REAP_INTERVAL:
+                    self._promote_delayed_jobs()
+                    self._requeue_expired_jobs()
+                    last_reap = time.monotonic()
+                
+                claimed = self._claim_next_job()
+                if claimed:
+                    self._process_single_job(*claimed, document_processor)
+                else:
+                    self._stop_event.wait(settings.RAG_QUEUE_POLL_INTERVAL)
             except Exception as e:
                 logger.error(f"Queue worker error: {str(e)}")
-                time.sleep(5)
+                self._stop_event.wait(5)
     
-    def _get_next_job(self) -> str:
-        """Get next job from queue if processing capacity available"""
-        # Check for jobs
-        result = self.redis_client.blpop(self.queue_key, timeout=5)
-        if not result:
-            return None
-            
-        job_id = result[1]
-        
-        # Check concurrent processing limit
-        processing_count = self.redis_client.scard(self.processing_key)
-        if processing_count >= settings.RAG_MAX_CONCURRENT_PROCESSING:
-            # Put back in queue and wait
-            self.redis_client.lpush(self.queue_key, job_id)
-            time.sleep(5)
+    def _claim_next_job(self) -> Optional[Tuple[str, str]]:
+        """Atomically claim the next job if cluster-wide capacity is available; (job_id, claim_id)"""
+        claimed = self._claim(
+            keys=[self.queue_key, self.inflight_key, self.leases_key, self.claim_seq_key],
+            args=[settings.RAG_MAX_CONCURRENT_PROCESSING, time.time() + settings.RAG_QUEUE_VISIBILITY_TIMEOUT]
+        )
+        if not claimed:
             return None
+        job_id, claim_id = claimed
         
-        return job_id
+        enqueued_at = self.redis_client.hget(self.enqueued_key, job_id)
+        if enqueued_at:
+            wait_seconds = max(0.0, time.time() - float(enqueued_at))
+            pipe = self.redis_client.pipeline()
+            pipe.hincrby(self.metrics_key, 'claimed_total', 1)
+            pipe.hincrbyfloat(self.metrics_key, 'wait_seconds_total', wait_seconds)
+            pipe.hset(self.metrics_key, 'last_wait_seconds', round(wait_seconds, 3))
+            pipe.hdel(self.enqueued_key, job_id)
+            pipe.execute()
+        return job_id, claim_id
     
-    def _process_single_job(self, job_id: str):
+    def _extend_lease(self, job_id: str, claim_id: str) -> bool:
+        """Extend our lease; False when the job has been claimed by another worker"""
+        return bool(self._extend(
+            keys=[self.leases_key],
+            args=[job_id, claim_id, time.time() + settings.RAG_QUEUE_VISIBILITY_TIMEOUT]
+        ))
+    
+    def _ack(self, job_id: str, claim_id: str) -> bool:
+        """Remove a finished job from the in-flight list, if we still hold its claim"""
+        return bool(self._ack_script(keys=[self.inflight_key, self.leases_key], args=[job_id, claim_id]))
+    
+    def _requeue_expired_jobs(self):
+        """Return jobs whose worker stopped heartbeating to the queue"""
+        now = time.time()
+        for job_id, lease in self.redis_client.hgetall(self.leases_key).items():
+            if _lease_deadline(lease) > now:
+                continue
+            if self._requeue_expired(
+                keys=[self.queue_key, self.inflight_key, self.leases_key],
+                args=[job_id, now]
+            ):
+                self.redis_client.hset(self.enqueued_key, job_id, now)
+                self.redis_client.hincrby(self.metrics_key, 'requeued_total', 1)
+                logger.warning(f"Lease expired for job {job_id}; returned it to the queue")
+    
+    def _promote_delayed_jobs(self):
+        """Move retries whose backoff has elapsed back onto the queue"""
+        now = time.time()
+        for job_id in self.redis_client.zrangebyscore(self.delayed_key, 0, now):
+            # Only the process that removes the entry re-queues it
+            if self.redis_client.zrem(self.delayed_key, job_id):
+                self._enqueue(job_id)
+    
+    def _process_single_job(self, job_id: str, claim_id: str, document_processor: DocumentProcessor):
         """Process a single job"""
         # Get job data
         job_data = self._get_job_data(job_id)
         if not job_data:
             logger.error(f"Job {job_id} data not found")
+            self._ack(job_id, claim_id)
             return
         
-        # Mark as processing
-        self.redis_client.sadd(self.processing_key, job_id)
-        self._update_job_status(job_id, 'processing', 'Starting document processing')
+        with self._active_lock:
+            self._active_jobs[job_id] = claim_id
         
         try:
+            self._update_job_status(job_id, 'processing', 'Starting document processing')
             # Process the document
-            self.document_processor.process_job(job_data, self._update_job_status)
+            document_processor.process_job(job_data, self._update_job_status)
             self._update_job_status(job_id, 'completed', 'Document processed successfully')
+            self.redis_client.hincrby(self.metrics_key, 'completed_total', 1)
+        except LeaseLostError:
+            # Our lease expired and another worker now owns the job: stop, and leave
+            # its status, retries and in-flight entry to the new owner
+            logger.warning(f"Lease for job {job_id} was taken over by another worker; abandoning it")
         except Exception as e:
             logger.error(f"Error processing job {job_id}: {str(e)}")
-            self._handle_job_failure(job_id, job_data, str(e))
+            try:
+                self._handle_job_failure(job_id, claim_id, job_data, str(e))
+            except LeaseLostError:
+                logger.warning(f"Lease for job {job_id} was taken over by another worker; abandoning it")
         finally:
-            # Remove from processing set
-            self.redis_client.srem(self.processing_key, job_id)
+            with self._active_lock:
+                self._active_jobs.pop(job_id, None)
+            self._ack(job_id, claim_id)
     
     def _get_job_data(self, job_id: str) -> Dict[str, Any]:
         """Get job data from Redis"""
@@ -122,6 +288,13 @@ class RedisQueueManager:
     
     def _update_job_status(self, job_id: str, status: str, message: str, progress_data: dict = None):
         """Update job status in Redis and database"""
+        # Progress from a job this process is running doubles as its heartbeat;
+        # a lost claim stops the job before it writes over the new owner's status
+        with self._active_lock:
+            claim_id = self._active_jobs.get(job_id)
+        if claim_id is not None and not self._extend_lease(job_id, claim_id):
+            raise LeaseLostError(details={'job_id': job_id})
+        
         # Update Redis
         job_data = self._get_job_data(job_id)
         if job_data:
@@ -132,7 +305,7 @@ class RedisQueueManager:
             })
             if progress_data:
                 job_data['progress'] = progress_data
-                
+            
             self.redis_client.setex(
                 f"{self.status_key_prefix}{job_id}",
                 settings.RAG_PROCESSING_TIMEOUT * 2,
@@ -197,8 +370,8 @@ class RedisQueueManager:
         except Exception as e:
             logger.error(f"Failed to send WebSocket update: {str(e)}")
     
-    def _handle_job_failure(self, job_id: str, job_data: Dict[str, Any], error: str):
-        """Handle failed job with retry logic"""
+    def _handle_job_failure(self, job_id: str, claim_id: str, job_data: Dict[str, Any], error: str):
+        """Handle failed job with retry logic; raises LeaseLostError if another worker owns the job"""
         retry_count = job_data.get('retry_count', 0)
         
         if retry_count < settings.RAG_RETRY_MAX_ATTEMPTS:
@@ -206,16 +379,18 @@ class RedisQueueManager:
             job_data['retry_count'] = retry_count + 1
             job_data['last_error'] = error
             
-            # Update Redis
-            self.redis_client.setex(
-                f"{self.status_key_prefix}{job_id}",
-                settings.RAG_PROCESSING_TIMEOUT * 2,
-                json.dumps(job_data)
+            # Store the attempt and schedule the retry (instead of blocking this worker
+            # during the delay) in one step fenced by our claim, so a worker whose lease
+            # was taken over never queues a second run of the job
+            scheduled = self._schedule_retry(
+                keys=[self.leases_key, f"{self.status_key_prefix}{job_id}", self.delayed_key],
+                args=[
+                    job_id, claim_id, settings.RAG_PROCESSING_TIMEOUT * 2,
+                    json.dumps(job_data), time.time() + settings.RAG_RETRY_DELAY
+                ]
             )
-            
-            # Add back to queue with delay
-            time.sleep(settings.RAG_RETRY_DELAY)
-            self.redis_client.rpush(self.queue_key, job_id)
+            if not scheduled:
+                raise LeaseLostError(details={'job_id': job_id})
             
             # Update status
             self._update_job_status(
@@ -225,6 +400,7 @@ class RedisQueueManager:
         else:
             # Mark as failed
             self._update_job_status(job_id, 'failed', f'Processing failed: {error}')
+            self.redis_client.hincrby(self.metrics_key, 'failed_total', 1)
     
     def get_queue_length(self) -> int:
         """Get current queue length"""
@@ -232,10 +408,26 @@ class RedisQueueManager:
     
     def get_queue_stats(self) -> Dict[str, Any]:
         """Get queue statistics"""
+        metrics = self.redis_client.hgetall(self.metrics_key)
+        claimed = int(metrics.get('claimed_total', 0))
+        wait_total = float(metrics.get('wait_seconds_total', 0))
+        
+        enqueued = self.redis_client.hvals(self.enqueued_key)
+        oldest_wait = max((time.time() - float(ts) for ts in enqueued), default=0.0)
+        
         return {
             'queue_length': self.get_queue_length(),
-            'processing_count': self.redis_client.scard(self.processing_key),
-            'max_concurrent': settings.RAG_MAX_CONCURRENT_PROCESSING
+            'processing_count': self.redis_client.llen(self.inflight_key),
+            'delayed_count': self.redis_client.zcard(self.delayed_key),
+            'max_concurrent': settings.RAG_MAX_CONCURRENT_PROCESSING,
+            'workers_per_process': settings.RAG_WORKER_CONCURRENCY,
+            'claimed_total': claimed,
+            'completed_total': int(metrics.get('completed_total', 0)),
+            'failed_total': int(metrics.get('failed_total', 0)),
+            'requeued_total': int(metrics.get('requeued_total', 0)),
+            'avg_wait_seconds': round(wait_total / claimed, 3) if claimed else 0.0,
+            'last_wait_seconds': float(metrics.get('last_wait_seconds', 0)),
+            'oldest_queued_seconds': round(oldest_wait, 3)
         }
     
     def get_queue_state(self) -> List[Dict[str, Any]]:
@@ -250,7 +442,7 @@ class RedisQueueManager:
                 queue_jobs.append(job_data)
         
         # Get processing jobs
-        processing_ids = self.redis_client.smembers(self.processing_key)
+        processing_ids = self.redis_client.lrange(self.inflight_key, 0, -1)
         for job_id in processing_ids:
             job_data = self._get_job_data(job_id)
             if job_data:
@@ -264,4 +456,20 @@ class RedisQueueManager:
             self.redis_client.ping()
             return True
         except:
-            return False
\ No newline at end of file
+            return False
+
+
+_queue_manager = None
+_queue_manager_lock = threading.Lock()
+
+
+def get_queue_manager() -> RedisQueueManager:
+    """Process-wide queue manager; starts the worker pool on first use"""
+    global _queue_manager
+    if _queue_manager is None:
+        with _queue_manager_lock:
+            if _queue_manager is None:
+                manager = RedisQueueManager()
+                manager.start_workers()
+                _queue_manager = manager
+    return _queue_manager
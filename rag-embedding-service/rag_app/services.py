@@ -10,7 +10,7 @@ from .exceptions import (
     ProcessingError,
     ValidationError
 )
-from .utils import RedisQueueManager, query_embeddings
+from .utils import get_queue_manager, query_embeddings
 from .langchain_integration import process_rag_query
 
 logger = logging.getLogger(__name__)
@@ -83,7 +83,7 @@ class EmbeddingService:
     """Handle document embedding operations"""
     
     def __init__(self):
-        self.queue_manager = RedisQueueManager()
+        self.queue_manager = get_queue_manager()
     
     def process_document(self, document_id: str, cancer_type_id: int, user_id: int, jwt_token: str) -> Dict[str, Any]:
         """Submit document for embedding processing"""
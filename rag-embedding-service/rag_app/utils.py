@@ -5,25 +5,21 @@ import logging
 import requests
 from typing import List, Dict, Any, Optional
 from django.conf import settings
-from langchain_openai import OpenAIEmbeddings
 
 from .exceptions import ExternalServiceError
+from .embedding_cache import get_query_embedding
 
 logger = logging.getLogger(__name__)
 
 # Re-export queue manager for compatibility
-from .queue_manager import RedisQueueManager
+from .queue_manager import RedisQueueManager, get_queue_manager
 
 
 def query_embeddings(query: str, cancer_type_id: Optional[int] = None, k: int = 5) -> List[Dict[str, Any]]:
     """Query embeddings using vector similarity search"""
     try:
-        # Generate query embedding
-        embeddings_model = OpenAIEmbeddings(
-            openai_api_key=settings.OPENAI_API_KEY,
-            model=settings.OPENAI_EMBEDDING_MODEL
-        )
-        query_embedding = embeddings_model.embed_query(query)
+        # Generate query embedding (cached by model + normalized text)
+        query_embedding = get_query_embedding(query)
         
         # Search via database service
         headers = {'X-Service-Token': settings.DATABASE_SERVICE_TOKEN}
@@ -50,7 +46,7 @@ def query_embeddings(query: str, cancer_type_id: Optional[int] = None, k: int =
 
 def get_processing_status(job_id: str) -> Dict[str, Any]:
     """Get processing status for a job"""
-    queue_manager = RedisQueueManager()
+    queue_manager = get_queue_manager()
     
     # Check Redis first
     status_key = f"{queue_manager.status_key_prefix}{job_id}"
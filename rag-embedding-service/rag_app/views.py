@@ -9,7 +9,7 @@ from django.conf import settings
 from .decorators import handle_exceptions, require_auth
 from .exceptions import ValidationError
 from .services import EmbeddingService, ChatService
-from .utils import RedisQueueManager
+from .utils import get_queue_manager
 from .auth import verify_jwt_token  # Import for backward compatibility
 
 logger = logging.getLogger(__name__)
@@ -77,7 +77,7 @@ def get_embedding_status(request, job_id=None):
 @require_auth
 def get_queue_status(request):
     """Get current queue state"""
-    queue_manager = RedisQueueManager()
+    queue_manager = get_queue_manager()
     queue_state = queue_manager.get_queue_state()
     
     return Response({
@@ -136,7 +136,7 @@ def clear_session(request):
 @handle_exceptions
 def health_check(request):
     """Health check endpoint"""
-    queue_manager = RedisQueueManager()
+    queue_manager = get_queue_manager()
     
     # Check components
     redis_healthy = queue_manager.health_check()
@@ -131,6 +131,16 @@ RAG_MAX_CONCURRENT_PROCESSING = int(os.getenv('RAG_MAX_CONCURRENT_PROCESSING', '
 RAG_PROCESSING_TIMEOUT = int(os.getenv('RAG_PROCESSING_TIMEOUT', '300'))  # 5 minutes
 RAG_RETRY_MAX_ATTEMPTS = int(os.getenv('RAG_RETRY_MAX_ATTEMPTS', '3'))
 RAG_RETRY_DELAY = int(os.getenv('RAG_RETRY_DELAY', '60'))  # 1 minute
+RAG_QUERY_EMBEDDING_CACHE_BYTES = int(os.getenv('RAG_QUERY_EMBEDDING_CACHE_BYTES', str(16 * 1024 * 1024)))  # in-process LRU, float32 bytes
+RAG_QUERY_EMBEDDING_CACHE_TTL = int(os.getenv('RAG_QUERY_EMBEDDING_CACHE_TTL', '604800'))  # 7 days in Redis
+RAG_EMBEDDING_BATCH_SIZE = int(os.getenv('RAG_EMBEDDING_BATCH_SIZE', '100'))  # chunks per embed_documents call
+RAG_EMBEDDING_CONCURRENCY = int(os.getenv('RAG_EMBEDDING_CONCURRENCY', '4'))  # batches in flight per job
+RAG_EMBEDDING_MAX_RETRIES = int(os.getenv('RAG_EMBEDDING_MAX_RETRIES', '5'))
+RAG_INGEST_FLUSH_SIZE = int(os.getenv('RAG_INGEST_FLUSH_SIZE', '200'))  # chunks embedded and saved per flush
+RAG_WORKER_CONCURRENCY = int(os.getenv('RAG_WORKER_CONCURRENCY', '2'))  # worker threads per process
+RAG_QUEUE_VISIBILITY_TIMEOUT = int(os.getenv('RAG_QUEUE_VISIBILITY_TIMEOUT', str(RAG_PROCESSING_TIMEOUT)))  # lease without progress before re-queue
+RAG_QUEUE_POLL_INTERVAL = float(os.getenv('RAG_QUEUE_POLL_INTERVAL', '1'))
+RAG_QUEUE_REAP_INTERVAL = int(os.getenv('RAG_QUEUE_REAP_INTERVAL', '15'))
 
 # File storage
 TEMP_FILE_PATH = os.path.join(BASE_DIR, 'media', 'temp_files')
@@ -0,0 +1,135 @@
+# Shared by suggestion-service and translation-service: this file is the single
+# copy. Docker builds copy it to /shared (on PYTHONPATH) through the "shared"
+# build context in docker-compose.yml; outside Docker run with PYTHONPATH=../shared.
+import os
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+import jwt  # pyjwt
+
+log = logging.getLogger(__name__)
+
+# ---- Config ---------------------------------------------------------------
+JWT_ALGO = os.getenv("JWT_ALGO", "HS256")               # used for the JWT_SECRET_KEY fallback key
+JWT_SECRET = os.getenv("JWT_SECRET_KEY")
+JWT_KEYS_FILE = os.getenv("JWT_KEYS_FILE")              # JWKS-like file, enables key rotation
+JWT_KEYS_RELOAD_SECONDS = float(os.getenv("JWT_KEYS_RELOAD_SECONDS", "30"))
+JWT_CLAIMS_CACHE_SIZE = int(os.getenv("JWT_CLAIMS_CACHE_SIZE", "10000"))
+
+class JWTVerifier:
+    """Local JWT verification with a bounded LRU of decoded claims.
+
+    Keys come from JWT_KEYS_FILE when set, in a JWKS-like layout:
+        {"keys": [{"kid": "2026-10", "alg": "HS256", "k": "<secret>"},
+                  {"kid": "rsa-1", "alg": "RS256", "pem": "-----BEGIN PUBLIC KEY-----..."}]}
+    A token's "kid" header selects its key; tokens without one are tried against
+    every key, newest (first) first. JWT_SECRET_KEY is used when no file is set.
+    The file is re-read when it changes, and the claims cache is cleared so
+    tokens signed with a retired key stop verifying.
+    """
+
+    def __init__(self, keys_file: str | None = JWT_KEYS_FILE, secret: str | None = JWT_SECRET,
+                 algorithm: str = JWT_ALGO, cache_size: int = JWT_CLAIMS_CACHE_SIZE):
+        self.keys_file = keys_file
+        self.secret = secret
+        self.algorithm = algorithm
+        self.cache_size = cache_size
+        self._claims = OrderedDict()   # token -> (claims, exp)
+        self._lock = threading.Lock()
+        self._keys = []                # [(kid, alg, key)]
+        self._keys_mtime = None
+        self._keys_checked = 0.0
+        self.counters = {"hits": 0, "misses": 0, "failures": 0, "evictions": 0, "key_reloads": 0}
+        self._load_keys()
+
+    # ---- keys ----
+    def _load_keys(self) -> None:
+        if not self.keys_file:
+            self._keys = [(None, self.algorithm, self.secret)] if self.secret else []
+            return
+        try:
+            mtime = os.stat(self.keys_file).st_mtime
+            if mtime == self._keys_mtime:
+                return
+            with open(self.keys_file, encoding="utf-8") as f:
+                data = json.load(f)
+            keys = [(k.get("kid"), k.get("alg", self.algorithm), k.get("k") or k.get("pem"))
+                    for k in data.get("keys", []) if k.get("k") or k.get("pem")]
+        except (OSError, ValueError) as e:
+            log.error(f"Could not load JWT keys from {self.keys_file}: {e}")
+            return
+        with self._lock:
+            self._keys = keys
+            self._keys_mtime = mtime
+            self._claims.clear()
+            self.counters["key_reloads"] += 1
+        log.info(f"Loaded {len(keys)} JWT verification keys")
+
+    def _maybe_reload_keys(self) -> None:
+        now = time.monotonic()
+        if self.keys_file and now - self._keys_checked >= JWT_KEYS_RELOAD_SECONDS:
+            self._keys_checked = now
+            self._load_keys()
+
+    def _candidate_keys(self, token: str):
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is not None:
+            return [k for k in self._keys if k[0] == kid]
+        return self._keys
+
+    # ---- verification ----
+    def verify(self, token: str) -> dict:
+        """Decoded claims; raises jwt.ExpiredSignatureError / jwt.InvalidTokenError."""
+        self._maybe_reload_keys()
+        now = time.time()
+        with self._lock:
+            cached = self._claims.get(token)
+            if cached is not None and (cached[1] is None or cached[1] > now):
+                self._claims.move_to_end(token)
+                self.counters["hits"] += 1
+                return cached[0]
+            self.counters["misses"] += 1
+
+        claims = self._decode(token)
+        exp = claims.get("exp")
+        with self._lock:
+            self._claims[token] = (claims, float(exp) if exp is not None else None)
+            while len(self._claims) > self.cache_size:
+                self._claims.popitem(last=False)
+                self.counters["evictions"] += 1
+        return claims
+
+    def _decode(self, token: str) -> dict:
+        try:
+            keys = self._candidate_keys(token)
+        except jwt.InvalidTokenError:
+            self.counters["failures"] += 1
+            raise
+        if not keys:
+            self.counters["failures"] += 1
+            raise jwt.InvalidTokenError("No verification key for token")
+        error = None
+        for _, alg, key in keys:
+            try:
+                return jwt.decode(token, key, algorithms=[alg])
+            except jwt.ExpiredSignatureError:
+                self.counters["failures"] += 1
+                raise
+            except jwt.InvalidTokenError as e:
+                error = e
+        self.counters["failures"] += 1
+        raise error
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "cached_tokens": len(self._claims), "keys": len(self._keys)}
+
+_verifier = None
+
+def get_verifier() -> JWTVerifier:
+    global _verifier
+    if _verifier is None:
+        _verifier = JWTVerifier()
+    return _verifier
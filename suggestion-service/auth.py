@@ -1,24 +1,21 @@
 import os
-import jwt  # pyjwt
-from fastapi import Depends, HTTPException, status
+import hmac
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import jwt  # pyjwt
+from jwt_verifier import get_verifier
 
 # Bearer auth extractor
 auth_scheme = HTTPBearer(auto_error=False)
 
-# Config via env
-JWT_ALGO = os.getenv("JWT_ALGO", "HS256")        # HS256 or RS256, etc.
-JWT_SECRET = os.getenv("JWT_SECRET_KEY")             # used for HS*
+# internal callers present the shared service token instead of a user JWT
+SERVICE_TOKEN = os.getenv("DATABASE_SERVICE_TOKEN")
+ADMIN_ROLES = {"ADMIN"}
 
 def _decode_jwt(token: str) -> dict:
+    # verified locally; repeat tokens are served from the claims cache until they expire
     try:
-        if not JWT_SECRET:
-            raise HTTPException(status_code=500, detail="JWT_SECRET not set")
-        return jwt.decode(
-            token,
-            JWT_SECRET,
-            algorithms=[JWT_ALGO],
-        )
+        return get_verifier().verify(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -31,3 +28,16 @@ def require_jwt(creds: HTTPAuthorizationCredentials = Depends(auth_scheme)):
     claims = _decode_jwt(creds.credentials)
     # return whatever you want downstream (token for forwarding, plus claims)
     return {"token": creds.credentials, "claims": claims}
+
+def require_admin_or_service(x_service_token: str | None = Header(default=None),
+                             creds: HTTPAuthorizationCredentials = Depends(auth_scheme)):
+    """FastAPI dependency for maintenance endpoints: the service token, or a JWT with an admin role.
+    Service callers get token=None, so downstream calls use the service token too."""
+    if x_service_token is not None:
+        if SERVICE_TOKEN and hmac.compare_digest(x_service_token, SERVICE_TOKEN):
+            return {"token": None, "claims": {"role": "SERVICE"}}
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid service token")
+    user = require_jwt(creds)
+    if str(user["claims"].get("role", "")).upper() not in ADMIN_ROLES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return user
@@ -0,0 +1,66 @@
+"""Microbenchmark: list-based ranking (previous /suggest code) vs ranking.top_k.
+
+    python bench_ranking.py --sizes 1000 10000 100000 --history 200
+"""
+import argparse
+import time
+import numpy as np
+from ranking import norm_text, hash_texts, history_hashes, stable_shuffle, top_k
+
+THRESHOLD = 0.93
+
+def legacy_rank(scores, texts, history, seed_text, has_query=True):
+    asked = {norm_text(t) for t in history}
+    candidates = [i for i, t in enumerate(texts) if norm_text(t) not in asked]
+    if has_query and candidates:
+        candidates = [i for i in candidates if float(scores[i]) < THRESHOLD]
+    if not candidates:
+        candidates = [i for i, t in enumerate(texts) if norm_text(t) not in asked]
+        if not candidates:
+            return []
+    subset_scores = np.array([float(scores[i]) for i in candidates], dtype=np.float32)
+    if np.allclose(subset_scores, subset_scores[0]) or not has_query:
+        return stable_shuffle(candidates, seed_text)[:15].tolist()
+    return sorted(candidates, key=lambda i: float(scores[i]), reverse=True)[:15]
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--history", type=int, default=200, help="already-suggested texts in the session")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'templates':>10} {'legacy ms':>10} {'top_k ms':>10} {'speedup':>8}  same top-15")
+    for n in args.sizes:
+        texts = [f"Template question number {i}?" for i in range(n)]
+        matrix = rng.standard_normal((n, args.dim), dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        query = matrix[rng.integers(n)] + 0.1 * rng.standard_normal(args.dim, dtype=np.float32)
+        query /= np.linalg.norm(query)
+        history = [texts[i].upper() for i in rng.choice(n, size=min(args.history, n), replace=False)]
+        text_hashes = hash_texts(texts)   # precomputed once per template set
+        session = f"bench-{n}"
+        history_hashes(session, history)  # warm the per-session cache, as after the first request
+        scores = matrix @ query
+
+        def vectorized():
+            asked = np.isin(text_hashes, history_hashes(session, history))
+            return top_k(scores, asked, 15, True, THRESHOLD, "bench")
+
+        legacy_ms = timeit(lambda: legacy_rank(scores, texts, history, "bench"), args.repeat)
+        fast_ms = timeit(vectorized, args.repeat)
+        same = vectorized() == legacy_rank(scores, texts, history, "bench")
+        print(f"{n:>10} {legacy_ms:>10.2f} {fast_ms:>10.2f} {legacy_ms / fast_ms:>7.1f}x  {same}")
+
+if __name__ == "__main__":
+    main()
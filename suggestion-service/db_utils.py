@@ -1,10 +1,11 @@
 import os
-import json
 import logging
 from typing import List, Tuple
+import httpx
 import numpy as np
-import requests
-from model import MODEL, l2norm
+from fastapi.concurrency import run_in_threadpool
+from model import MODEL, MODEL_NAME, MODEL_VERSION, l2norm
+import template_cache
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("suggestion-service")
@@ -12,76 +13,121 @@ log = logging.getLogger("suggestion-service")
 # ---- Config ---------------------------------------------------------------
 TIMEOUT = float(os.getenv("SVC_HTTP_TIMEOUT", "3.0"))
 DB_URL = os.getenv("DB_SERVICE_URL", "http://database-service:8004/api/chat")
-
-def user_headers(user_token: str):
+MAX_CONNECTIONS = int(os.getenv("SVC_HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("SVC_HTTP_MAX_KEEPALIVE", "20"))
+SERVICE_TOKEN = os.getenv("DATABASE_SERVICE_TOKEN")
+
+_client: httpx.AsyncClient | None = None
+
+def get_client() -> httpx.AsyncClient:
+    """Shared keep-alive connection pool to the database service."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE),
+        )
+    return _client
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def user_headers(user_token: str | None):
+    # background jobs have no user; they authenticate as a service
+    if user_token is None:
+        return {"X-Service-Token": SERVICE_TOKEN or "", "Content-Type": "application/json"}
     return {"Authorization": f"Bearer {user_token}", "Content-Type": "application/json"}
 
 # ---- Utils ----------------------------------------------------------------
-def db_last_messages(session_id: str, user_token: str, limit: int = 5) -> List[dict]:
-    url = f"{DB_URL}/internal/sessions/last-messages/"
-    r = requests.get(url, params={"session_id": session_id, "limit": limit},
-                     headers=user_headers(user_token), timeout=TIMEOUT)
-    r.raise_for_status()
-    return r.json() or []
-
-
-def db_templates(cancer_type: str, user_token: str) -> Tuple[List[int], List[str], np.ndarray]:
-    url = f"{DB_URL}/internal/suggestions/templates/"
-    r = requests.get(url, params={"cancer_type_name": cancer_type},
-                     headers=user_headers(user_token), timeout=TIMEOUT)
-    r.raise_for_status()
-    rows = r.json() or []
-
-    ids   = [row["id"]   for row in rows]
-    texts = [row["text"] for row in rows]
-
-    embs = []
-    missing = []
-
-    for i, row in enumerate(rows):
-        v = row.get("embedding_json", None)
-        if v is None:
-            vec = MODEL.encode(texts[i], normalize_embeddings=True)
-            embs.append(vec)
-            missing.append({"id": ids[i], "embedding": vec.tolist()})
-        else:
-            if isinstance(v, str):
-                v = json.loads(v)
-            embs.append(np.array(v, dtype=np.float32))
+async def _template_set_from_rows(cancer_type: str, rows: List[dict], version: str | None
+                                  ) -> template_cache.TemplateSet:
+    """Build the normalized template set and cache it. Templates without an embedding
+    are left out until the backfill encodes them; ones stored by another backend or
+    quantization of the same model are close enough to rank with until it re-encodes them."""
+    ids, texts, embs = [], [], []
+    unembedded = stale = 0
+    for row in rows:
+        v = row.get("embedding", None)
+        model = row.get("embedding_model") or ""
+        if v is None or model.split("/")[0] != MODEL_NAME:
+            unembedded += 1
+            continue
+        if model != MODEL_VERSION:
+            stale += 1
+        ids.append(row["id"])
+        texts.append(row["text"])
+        embs.append(np.array(v, dtype=np.float32))
+    if unembedded or stale:
+        log.warning(f"{cancer_type}: {unembedded} templates without a {MODEL_NAME} embedding skipped, "
+                    f"{stale} from another encoder version; run the embedding backfill")
 
     arr = np.vstack(embs) if embs else np.zeros((0,384), dtype=np.float32)
     arr = l2norm(arr) if arr.size else arr
 
-    # push new embeddings back to DB (best-effort)
-    if missing:
-        try:
-            requests.post(
-                f"{DB_URL}/internal/suggestions/upsert-embeddings/",
-                headers=user_headers(user_token),
-                json={"items": missing},
-                timeout=TIMEOUT
-            ).raise_for_status()
-        except Exception as e:
-            log.warning(f"Embedding backfill POST failed: {e}")
-
-    return ids, texts, arr
-
-def db_history(session_id: str, user_token: str) -> List[str]:
-    url = f"{DB_URL}/internal/suggestions/history/"
-    r = requests.get(url, params={"session_id": session_id},
-                     headers=user_headers(user_token), timeout=TIMEOUT)
+    entry = template_cache.build(version, ids, texts, arr)
+    if version:
+        template_cache.put(cancer_type, entry)
+    return entry
+
+async def db_suggestion_context(session_id: str, cancer_type: str, user_token: str, limit: int = 5
+                                ) -> Tuple[List[dict], template_cache.TemplateSet, List[str]]:
+    """Last messages, templates and suggested history in one call; templates are
+    only transferred when the cached version is out of date."""
+    cached = template_cache.get(cancer_type)
+    params = {"session_id": session_id, "limit": limit, "cancer_type_name": cancer_type}
+    if cached is not None:
+        params["templates_version"] = cached.version
+
+    url = f"{DB_URL}/internal/suggestions/context/"
+    r = await get_client().get(url, params=params, headers=user_headers(user_token))
     r.raise_for_status()
-    return r.json() or []
-
-def db_set_last4(session_id: str, items: List[str], user_token: str) -> None:
+    data = r.json()
+
+    tpl = data.get("templates") or {}
+    if tpl.get("items") is None and cached is not None and tpl.get("version") == cached.version:
+        templates = cached
+    else:
+        templates = await _template_set_from_rows(cancer_type, tpl.get("items") or [], tpl.get("version"))
+
+    return data.get("messages") or [], templates, data.get("history") or []
+
+async def backfill_template_embeddings(user_token: str | None, cancer_type: str | None = None,
+                                      batch_size: int = 256) -> int:
+    """Encode every template whose embedding is missing or stale, batch by batch."""
+    params = {"model_version": MODEL_VERSION, "limit": batch_size}
+    if cancer_type:
+        params["cancer_type_name"] = cancer_type
+
+    updated, after_id = 0, 0
+    while True:
+        r = await get_client().get(f"{DB_URL}/internal/suggestions/stale-templates/",
+                                   params={**params, "after_id": after_id},
+                                   headers=user_headers(user_token))
+        r.raise_for_status()
+        rows = r.json() or []
+        if not rows:
+            break
+        after_id = rows[-1]["id"]
+
+        vecs = await run_in_threadpool(MODEL.encode, [row["text"] for row in rows],
+                                       normalize_embeddings=True, show_progress_bar=False)
+        items = [{"id": row["id"], "embedding": vec.tolist()} for row, vec in zip(rows, vecs)]
+        (await get_client().post(f"{DB_URL}/internal/suggestions/upsert-embeddings/",
+                                 headers=user_headers(user_token),
+                                 json={"items": items, "model_version": MODEL_VERSION})).raise_for_status()
+        updated += len(items)
+        log.info(f"Template embedding backfill: {updated} updated")
+    return updated
+
+async def db_set_last4(session_id: str, items: List[str], user_token: str) -> None:
     url = f"{DB_URL}/suggestions/"
-    requests.post(url, headers=user_headers(user_token),
-                  json={"session_id": session_id, "suggestions": items[:4]},
-                  timeout=TIMEOUT).raise_for_status()
+    (await get_client().post(url, headers=user_headers(user_token),
+                             json={"session_id": session_id, "suggestions": items[:4]})).raise_for_status()
 
-def db_append_history(session_id: str, items: List[str], user_token: str) -> None:
+async def db_append_history(session_id: str, items: List[str], user_token: str) -> None:
     url = f"{DB_URL}/internal/suggestions/history/"
-    requests.post(url, headers=user_headers(user_token),
-                  json={"session_id": session_id, "items": items[:4]},
-                  timeout=TIMEOUT).raise_for_status()
-
+    (await get_client().post(url, headers=user_headers(user_token),
+                             json={"session_id": session_id, "items": items[:4]})).raise_for_status()
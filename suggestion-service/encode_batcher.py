@@ -0,0 +1,81 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import numpy as np
+
+log = logging.getLogger("suggestion-service")
+
+# ---- Config ---------------------------------------------------------------
+BATCH_MAX_SIZE = int(os.getenv("SUGGEST_BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("SUGGEST_BATCH_MAX_WAIT_MS", "5"))
+
+class EncodeBatcher:
+    """Collects concurrent query texts for a few milliseconds and encodes them in one forward pass."""
+
+    def __init__(self, encoder, max_batch: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.encoder = encoder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        # one thread: the encoder already parallelizes a batch internally
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode-batcher")
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def encode(self, text: str) -> np.ndarray:
+        """L2-normalized embedding for one text, computed as part of the next batch."""
+        if self._task is None:
+            await self.start()
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, fut))
+        return await fut
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _ in batch]
+            try:
+                vecs = await loop.run_in_executor(self._executor, partial(
+                    self.encoder.encode, texts, batch_size=len(texts),
+                    normalize_embeddings=True, show_progress_bar=False,
+                ))
+            except Exception as e:
+                log.error(f"Batched encode of {len(texts)} texts failed: {e}")
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), vec in zip(batch, vecs):
+                if not fut.done():  # caller may have gone away
+                    fut.set_result(np.asarray(vec, dtype=np.float32))
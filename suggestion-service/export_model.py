@@ -1,37 +1,49 @@
-from transformers import AutoTokenizer, AutoModel
-from optimum.exporters.onnx import OnnxConfig, OnnxConverter
-from optimum.exporters.tasks import TasksManager
+import argparse
+import json
+import sys
 from pathlib import Path
+import numpy as np
+from transformers import AutoTokenizer
+from optimum.exporters.onnx import main_export
+from onnxruntime.quantization import quantize_dynamic, QuantType
 
-model_id = "sentence-transformers/all-MiniLM-L6-v2"
-output_dir = Path("onnx")
+from onnx_encoder import OnnxEncoder
+
+MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+
+parser = argparse.ArgumentParser(description="Export all-MiniLM-L6-v2 to ONNX for SUGGEST_ENCODER_BACKEND=onnx")
+parser.add_argument("--output-dir", default="onnx")
+parser.add_argument("--quantize", action="store_true", help="also write an int8 model_quantized.onnx")
+parser.add_argument("--check", action="store_true", help="compare ONNX embeddings with the PyTorch model")
+parser.add_argument("--samples", default="suggestions.json", help="texts used for the parity check")
+args = parser.parse_args()
+
+output_dir = Path(args.output_dir)
 output_dir.mkdir(parents=True, exist_ok=True)
 
-# Load tokenizer and model
-tokenizer = AutoTokenizer.from_pretrained(model_id)
-model = AutoModel.from_pretrained(model_id)
-
-# Prepare config for ONNX export
-task = "feature-extraction"
-exporter = "onnx"
-
-# Get ONNX config for model
-onnx_config_constructor = TasksManager.get_exporter_config_constructor(
-    exporter=exporter,
-    model=model,
-    task=task,
-    library_name="transformers",  # explicit to suppress warning
-)
-onnx_config = onnx_config_constructor(model.config)
-
-# Set up the ONNX exporter
-onnx_converter = OnnxConverter(
-    model=model,
-    task=task,
-    onnx_config=onnx_config,
-    tokenizer=tokenizer,
-    feature="default",  # used for feature-extraction tasks
-)
-
-# Run export
-onnx_converter.export(output_dir=output_dir, show_progress_bar=False)
+# Export the transformer (feature-extraction returns last_hidden_state; pooling happens in OnnxEncoder)
+main_export(MODEL_ID, output=output_dir, task="feature-extraction", library_name="transformers")
+AutoTokenizer.from_pretrained(MODEL_ID).save_pretrained(output_dir)  # writes tokenizer.json
+
+if args.quantize:
+    quantize_dynamic(
+        model_input=str(output_dir / "model.onnx"),
+        model_output=str(output_dir / "model_quantized.onnx"),
+        weight_type=QuantType.QInt8,
+    )
+
+# Parity: cosine between PyTorch and ONNX embeddings of the same texts
+if args.check:
+    from sentence_transformers import SentenceTransformer
+
+    texts = json.loads(Path(args.samples).read_text(encoding="utf-8"))
+    reference = SentenceTransformer("all-MiniLM-L6-v2").encode(texts, normalize_embeddings=True)
+
+    failed = False
+    variants = [("fp32", False, 0.999)] + ([("int8", True, 0.98)] if args.quantize else [])
+    for name, quantized, threshold in variants:
+        onnx_embs = OnnxEncoder(output_dir, quantized=quantized).encode(texts, normalize_embeddings=True)
+        cos = np.sum(reference * onnx_embs, axis=1)
+        print(f"{name}: min cosine {cos.min():.5f}, mean {cos.mean():.5f} over {len(texts)} texts (threshold {threshold})")
+        failed |= bool(cos.min() < threshold)
+    sys.exit(1 if failed else 0)
@@ -1,12 +1,36 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import os
+from pathlib import Path
+from onnx_encoder import OnnxEncoder
 
-# ---- Model / encoder ------------------------------------------------------
-MODEL = SentenceTransformer("all-MiniLM-L6-v2")
+# ---- Config ---------------------------------------------------------------
+MODEL_NAME = "all-MiniLM-L6-v2"
 USED_SIM_THRESHOLD = float(os.getenv("SUGGEST_USED_SIM_THRESHOLD", "0.93"))
+ENCODER_BACKEND = os.getenv("SUGGEST_ENCODER_BACKEND", "torch").lower()   # torch | onnx
+ONNX_DIR = Path(os.getenv("SUGGEST_ONNX_DIR", "onnx"))
+ONNX_QUANTIZED = os.getenv("SUGGEST_ONNX_QUANTIZED", "false").lower() == "true"
+ONNX_THREADS = int(os.getenv("SUGGEST_ONNX_THREADS", "0"))               # 0 = onnxruntime default
+
+def encoder_version(backend: str = ENCODER_BACKEND, quantized: bool = ONNX_QUANTIZED) -> str:
+    """Model plus backend plus quantization, e.g. all-MiniLM-L6-v2/onnx-int8."""
+    if backend == "onnx":
+        return f"{MODEL_NAME}/onnx-{'int8' if quantized else 'fp32'}"
+    return f"{MODEL_NAME}/torch"
+
+# recorded next to stored template embeddings; rows from another version (including
+# another backend or quantization of the same model) are re-encoded
+MODEL_VERSION = encoder_version()
 
 def l2norm(x: np.ndarray) -> np.ndarray:
     denom = np.linalg.norm(x, axis=-1, keepdims=True)
     denom = np.clip(denom, 1e-9, None)
     return x / denom
+
+# ---- Model / encoder ------------------------------------------------------
+def load_encoder(backend: str = ENCODER_BACKEND):
+    if backend == "onnx":
+        return OnnxEncoder(ONNX_DIR, quantized=ONNX_QUANTIZED, threads=ONNX_THREADS)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME)
+
+MODEL = load_encoder()
@@ -0,0 +1,88 @@
+import os
+import socket
+import asyncio
+import logging
+import redis.asyncio as redis
+from result_cache import get_redis
+from suggester import compute_suggestions, persist_last4
+
+log = logging.getLogger("suggestion-service")
+
+# ---- Config ---------------------------------------------------------------
+PRECOMPUTE_ENABLED = os.getenv("SUGGEST_PRECOMPUTE", "true").lower() == "true"
+MESSAGE_STREAM = os.getenv("CHAT_MESSAGE_STREAM", "chat:messages")
+CONSUMER_GROUP = os.getenv("SUGGEST_PRECOMPUTE_GROUP", "suggestion-precompute")
+PRECOMPUTE_CONCURRENCY = int(os.getenv("SUGGEST_PRECOMPUTE_CONCURRENCY", "4"))
+READ_COUNT = 32
+READ_BLOCK_MS = 5000
+
+class PrecomputeWorker:
+    """Consumes the database service's "message persisted" stream and, after each
+    assistant reply, computes the next suggestions into the result cache so that
+    /suggest is a cache read in the common case."""
+
+    def __init__(self):
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._task: asyncio.Task | None = None
+        self._slots = asyncio.Semaphore(PRECOMPUTE_CONCURRENCY)
+
+    async def start(self) -> None:
+        if not PRECOMPUTE_ENABLED or self._task is not None:
+            return
+        try:
+            await get_redis().xgroup_create(MESSAGE_STREAM, CONSUMER_GROUP, id="$", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        except redis.RedisError as e:
+            log.warning(f"Suggestion precompute disabled, Redis unavailable: {e}")
+            return
+        self._task = asyncio.create_task(self._run())
+        log.info(f"Suggestion precompute consuming {MESSAGE_STREAM} as {self.consumer}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                response = await get_redis().xreadgroup(
+                    CONSUMER_GROUP, self.consumer, {MESSAGE_STREAM: ">"},
+                    count=READ_COUNT, block=READ_BLOCK_MS,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Reading {MESSAGE_STREAM} failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not response:
+                continue
+
+            entries = response[0][1]
+            # only the latest assistant reply per session matters; the event's user_id
+            # (the session's patient) owns the cached result
+            latest = {}
+            for _, fields in entries:
+                event = {k.decode(): v.decode() for k, v in fields.items()}
+                if event.get("role") == "assistant" and event.get("cancer_type") and event.get("user_id"):
+                    latest[event["session_id"]] = (event["cancer_type"], event["user_id"])
+
+            await asyncio.gather(*(self._precompute(sid, ct, uid) for sid, (ct, uid) in latest.items()))
+            # best-effort: a failed precompute just falls back to computing on request
+            await get_redis().xack(MESSAGE_STREAM, CONSUMER_GROUP, *[entry_id for entry_id, _ in entries])
+
+    async def _precompute(self, session_id: str, cancer_type: str, owner_id: str) -> None:
+        async with self._slots:
+            try:
+                result = await compute_suggestions(session_id, cancer_type, None, owner_id)
+                if result["top_4"]:
+                    await persist_last4(session_id, result["top_4"], None)
+            except Exception as e:
+                log.warning(f"Precompute for session {session_id} failed: {e}")
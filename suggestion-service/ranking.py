@@ -0,0 +1,77 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# ---- Config ---------------------------------------------------------------
+HISTORY_CACHE_SIZE = int(os.getenv("SUGGEST_HISTORY_CACHE_SIZE", "10000"))
+
+def norm_text(s: str) -> str:
+    """Normalize text for exact-match comparison (case/whitespace insensitive)."""
+    return " ".join((s or "").lower().strip().split())
+
+def hash_texts(texts) -> np.ndarray:
+    """Stable 64-bit hashes of normalized texts, for vectorized membership tests."""
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(norm_text(t).encode("utf-8"), digest_size=8).digest(), "little")
+         for t in texts),
+        dtype=np.uint64,
+    )
+
+# ---- Per-session history hashes -------------------------------------------
+# Suggested history only grows within a session, so (session, length) identifies it.
+_history = OrderedDict()
+_history_lock = threading.Lock()
+
+def history_hashes(session_id: str, history: list[str]) -> np.ndarray:
+    key = (session_id, len(history))
+    with _history_lock:
+        hashes = _history.get(key)
+        if hashes is not None:
+            _history.move_to_end(key)
+            return hashes
+
+    hashes = np.unique(hash_texts(history))
+    with _history_lock:
+        _history[key] = hashes
+        while len(_history) > HISTORY_CACHE_SIZE:
+            _history.popitem(last=False)
+    return hashes
+
+# ---- Ranking --------------------------------------------------------------
+def stable_shuffle(indices: np.ndarray, seed_text: str) -> np.ndarray:
+    """Deterministically shuffle indices using a seed derived from session+context."""
+    seed = int(hashlib.sha256(seed_text.encode("utf-8")).hexdigest(), 16) % (2**32)
+    rng = np.random.default_rng(seed)
+    arr = np.array(indices, dtype=np.int64)
+    rng.shuffle(arr)
+    return arr
+
+def top_k(scores: np.ndarray, asked: np.ndarray, k: int, has_query: bool,
+          sim_threshold: float, seed_text: str) -> list[int]:
+    """Indices of the k best templates that were not asked and are not near-duplicates of the query.
+
+    Filtering is done with boolean masks and selection with argpartition, so the cost is
+    O(n) in the number of templates plus O(k log k) for ordering the winners.
+    """
+    allowed = ~asked
+    candidates = allowed & (scores < sim_threshold) if has_query else allowed
+    # fallback: if all filtered by similarity, keep "not already asked"
+    if not candidates.any():
+        candidates = allowed
+    idx = np.flatnonzero(candidates)
+    if idx.size == 0:
+        return []
+
+    # deterministic shuffle if low signal
+    sub = scores[idx]
+    if not has_query or np.allclose(sub, sub[0]):
+        return stable_shuffle(idx, seed_text)[:k].tolist()
+
+    if idx.size > k:
+        best = np.argpartition(-sub, k - 1)[:k]
+    else:
+        best = np.arange(idx.size)
+    best = best[np.argsort(-sub[best], kind="stable")]
+    return idx[best].tolist()
@@ -0,0 +1,105 @@
+import os
+import json
+import logging
+import redis.asyncio as redis
+from template_cache import cache_key
+
+log = logging.getLogger("suggestion-service")
+
+# ---- Config ---------------------------------------------------------------
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+RESULT_CACHE_TTL = int(os.getenv("SUGGEST_RESULT_CACHE_TTL", "30"))
+
+_redis: redis.Redis | None = None
+
+def get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(REDIS_URL)
+    return _redis
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+def result_key(session_id: str) -> str:
+    """One hash per session (field = cancer type); the database service deletes it
+    whenever a chat message or suggestion-history entry is written for the session."""
+    return f"suggest:result:{session_id}"
+
+def generation_key(session_id: str) -> str:
+    """Counter the database service bumps on every invalidation; a result computed from
+    a context read under an older generation is never stored."""
+    return f"suggest:gen:{session_id}"
+
+# store the entry only if no invalidation happened since the caller read the generation
+PUT_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+async def generation(session_id: str) -> str | None:
+    """Current invalidation generation ('' before the first); None if Redis is unavailable."""
+    try:
+        raw = await get_redis().get(generation_key(session_id))
+    except redis.RedisError as e:
+        log.warning(f"Result cache generation read failed: {e}")
+        return None
+    return raw.decode() if raw is not None else ""
+
+def owner_of(claims: dict | None) -> str | None:
+    """User id a cached result belongs to, from verified JWT claims."""
+    user_id = (claims or {}).get("user_id")
+    return str(user_id) if user_id is not None else None
+
+async def get(session_id: str, cancer_type: str, owner_id: str | None,
+              templates_version: str | None = None) -> dict | None:
+    """Previously computed suggestions, unless they belong to another user or the
+    template set has moved on since. Conversation and history changes need no
+    check here: the database service deletes the hash when either is written, and
+    put() refuses results computed before such a write."""
+    if owner_id is None:
+        return None
+    try:
+        raw = await get_redis().hget(result_key(session_id), cache_key(cancer_type))
+    except redis.RedisError as e:
+        log.warning(f"Result cache read failed: {e}")
+        return None
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    if entry.get("owner_id") != owner_id:
+        return None
+    if templates_version and entry.get("templates_version") != templates_version:
+        return None
+    return entry
+
+async def put(session_id: str, cancer_type: str, owner_id: str, templates_version: str | None,
+              generation_read: str | None, top4: list[str], top15: list[str]) -> None:
+    """Store a result computed from a context read at generation_read (see generation());
+    skipped when the session was invalidated meanwhile, so a message persisted during
+    the compute never leaves its stale result cached for the TTL."""
+    if generation_read is None:
+        return
+    entry = {
+        "owner_id": owner_id,
+        "templates_version": templates_version,
+        "top_4": top4,
+        "top_15": top15,
+    }
+    try:
+        stored = await get_redis().eval(
+            PUT_SCRIPT, 2, result_key(session_id), generation_key(session_id),
+            generation_read, cache_key(cancer_type), json.dumps(entry), RESULT_CACHE_TTL,
+        )
+    except redis.RedisError as e:
+        log.warning(f"Result cache write failed: {e}")
+        return
+    if not stored:
+        log.info(f"Result cache write skipped for {session_id}: invalidated during compute")
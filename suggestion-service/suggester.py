@@ -0,0 +1,73 @@
+import logging
+import numpy as np
+from db_utils import db_suggestion_context, db_set_last4
+from model import MODEL, USED_SIM_THRESHOLD
+from encode_batcher import EncodeBatcher
+from ranking import history_hashes, top_k
+import result_cache
+
+log = logging.getLogger("suggestion-service")
+
+EMPTY = {"top_4": [], "top_15": []}
+
+# concurrent /suggest calls (and precompute jobs) share one batched forward pass
+BATCHER = EncodeBatcher(MODEL)
+
+async def persist_last4(session_id: str, top4: list[str], user_token: str | None) -> None:
+    """Store last-4 for reload (best-effort, no history writes here)."""
+    try:
+        await db_set_last4(session_id, top4, user_token)
+    except Exception as e:
+        log.warning(f"Persist last-4 failed: {e}")
+
+async def compute_suggestions(session_id: str, cancer_type: str, user_token: str | None,
+                              owner_id: str | None) -> dict:
+    """Score and rank templates for the session, and store the result in the result cache
+    for owner_id (the session's patient user id; not cached when unknown).
+    user_token=None calls the database service with the service token."""
+    # read before the context, so a write that lands during the compute keeps this result out of the cache
+    generation = await result_cache.generation(session_id) if owner_id is not None else None
+
+    # 1) last messages, templates (cached matrix) and history in one call
+    try:
+        last_msgs, templates, history = await db_suggestion_context(
+            session_id, cancer_type, user_token, limit=5)
+    except Exception as e:
+        log.error(f"DB suggestion-context fetch failed: {e}")
+        return EMPTY
+
+    last_user_msg = next(
+        (m.get("content", "") for m in reversed(last_msgs)
+         if m.get("role") == "user" and m.get("content")),
+        ""
+    )
+    convo_tail_text = last_user_msg or "\n".join(
+        f"{m.get('role')}: {m.get('content','')}" for m in last_msgs[-3:]
+    )
+
+    texts, embs = templates.texts, templates.matrix
+    if embs.shape[0] == 0:
+        return EMPTY
+
+    # 2) score vs current query
+    if convo_tail_text.strip():
+        q_emb = await BATCHER.encode(convo_tail_text)
+    else:
+        q_emb = np.zeros(embs.shape[1], dtype=np.float32)
+    scores = embs @ q_emb
+
+    # 3) filter: never suggest anything already asked in this session (hashed,
+    #    normalized history cached per session), nor anything VERY similar to the
+    #    current user message; 4) top-15 via argpartition, deterministic shuffle if low signal
+    asked = np.isin(templates.text_hashes, history_hashes(session_id, history))
+    ranked = top_k(scores, asked, 15, bool(convo_tail_text.strip()), USED_SIM_THRESHOLD,
+                   f"{session_id}|{convo_tail_text[:128]}")
+    if not ranked:
+        return EMPTY
+
+    top15 = [texts[i] for i in ranked]
+    top4  = top15[:4]
+
+    if owner_id is not None:
+        await result_cache.put(session_id, cancer_type, owner_id, templates.version, generation, top4, top15)
+    return {"top_4": top4, "top_15": top15}
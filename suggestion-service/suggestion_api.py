@@ -1,11 +1,14 @@
+import asyncio
 import logging
-import hashlib
-import numpy as np
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, status
 from pydantic import BaseModel
-from auth import require_jwt  # should return {"token": <raw user jwt>, "claims": {...}}
-from db_utils import db_last_messages, db_templates, db_history, db_set_last4
-from model import MODEL, USED_SIM_THRESHOLD
+from auth import require_jwt, require_admin_or_service  # {"token": <raw user jwt>, "claims": {...}}
+from jwt_verifier import get_verifier
+from db_utils import backfill_template_embeddings, close_client
+from suggester import BATCHER, compute_suggestions, persist_last4
+from precompute import PrecomputeWorker
+import result_cache
+import template_cache
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("suggestion-service")
@@ -13,27 +16,35 @@ log = logging.getLogger("suggestion-service")
 
 app = FastAPI(title="Suggestion Service")
 
+PRECOMPUTE = PrecomputeWorker()
+
+@app.on_event("startup")
+async def _start_background():
+    await BATCHER.start()
+    await PRECOMPUTE.start()
+
+@app.on_event("shutdown")
+async def _stop_background():
+    await PRECOMPUTE.stop()
+    await BATCHER.stop()
+    await close_client()
+    await result_cache.close_redis()
+
 # ---- Request model --------------------------------------------------------
 class SuggestReq(BaseModel):
     session_id: str
     cancer_type: str | None = "uterine"
 
-def _norm(s: str) -> str:
-    """Normalize text for exact-match comparison (case/whitespace insensitive)."""
-    return " ".join((s or "").lower().strip().split())
+class BackfillReq(BaseModel):
+    cancer_type: str | None = None
+    batch_size: int = 256
 
-def _stable_shuffle(indices: list[int], seed_text: str) -> list[int]:
-    """Deterministically shuffle indices using a seed derived from session+context."""
-    if not indices:
-        return []
-    seed = int(hashlib.sha256(seed_text.encode("utf-8")).hexdigest(), 16) % (2**32)
-    rng = np.random.default_rng(seed)
-    arr = np.array(indices, dtype=np.int64)
-    rng.shuffle(arr)
-    return arr.tolist()
+@app.get("/health")
+async def health():
+    return {"status": "ok", "auth_cache": get_verifier().stats()}
 
 @app.post("/suggest")
-def suggest(body: SuggestReq, user=Depends(require_jwt)):
+async def suggest(body: SuggestReq, background_tasks: BackgroundTasks, user=Depends(require_jwt)):
     # pull user token (require_jwt returns dict or raw string)
     user_token = user["token"] if isinstance(user, dict) and "token" in user else user
     if not user_token:
@@ -42,73 +53,41 @@ def suggest(body: SuggestReq, user=Depends(require_jwt)):
     cancer_type = (body.cancer_type or "Uterine Cancer").strip()
     log.info(f"Suggesting for cancer type {cancer_type}")
 
-    # 1) latest user message to drive similarity
-    try:
-        last_msgs = db_last_messages(body.session_id, user_token, limit=5)
-    except Exception as e:
-        log.warning(f"DB last-messages fetch failed: {e}")
-        last_msgs = []
-
-    last_user_msg = next(
-        (m.get("content", "") for m in reversed(last_msgs)
-         if m.get("role") == "user" and m.get("content")),
-        ""
-    )
-    convo_tail_text = last_user_msg or "\n".join(
-        f"{m.get('role')}: {m.get('content','')}" for m in last_msgs[-3:]
-    )
-
-    # 2) templates + embeddings (lazy backfill inside db_templates)
-    try:
-        _, texts, embs = db_templates(cancer_type, user_token)
-    except Exception as e:
-        log.error(f"DB templates fetch failed: {e}")
-        return {"top_4": [], "top_15": []}
-
-    if embs.shape[0] == 0:
-        return {"top_4": [], "top_15": []}
-
-    # 3) score vs current query
-    if convo_tail_text.strip():
-        q_emb = MODEL.encode(convo_tail_text, normalize_embeddings=True, show_progress_bar=False)
-    else:
-        q_emb = np.zeros(embs.shape[1], dtype=np.float32)
-    scores = embs @ q_emb
-
-    # 4) filter: never suggest anything already asked in this session
-    try:
-        history = db_history(body.session_id, user_token)  # list[str]
-    except Exception as e:
-        log.warning(f"DB history fetch failed: {e}")
-        history = []
-    asked = {_norm(t) for t in history}
-    candidates = [i for i, t in enumerate(texts) if _norm(t) not in asked]
-
-    # also drop questions VERY similar to the current user message
-    if convo_tail_text.strip() and candidates:
-        candidates = [i for i in candidates if float(scores[i]) < USED_SIM_THRESHOLD]
-
-    # fallback: if all filtered by similarity, keep "not already asked"
-    if not candidates:
-        candidates = [i for i, t in enumerate(texts) if _norm(t) not in asked]
-        if not candidates:
-            return {"top_4": [], "top_15": []}
-
-    # 5) rank (deterministic shuffle if low signal)
-    subset_scores = np.array([float(scores[i]) for i in candidates], dtype=np.float32)
-    low_signal = (subset_scores.size == 0) or np.allclose(subset_scores, subset_scores[0]) or not convo_tail_text.strip()
-    if low_signal:
-        ranked = _stable_shuffle(candidates, f"{body.session_id}|{convo_tail_text[:128]}")
-    else:
-        ranked = sorted(candidates, key=lambda i: float(scores[i]), reverse=True)
-
-    top15 = [texts[i] for i in ranked[:15]]
-    top4  = top15[:4]
-
-    # 6) persist last-4 for reload (best-effort, no history writes here)
-    try:
-        db_set_last4(body.session_id, top4, user_token)
-    except Exception as e:
-        log.warning(f"Persist last-4 failed: {e}")
-
-    return {"top_4": top4, "top_15": top15}
+    # 0) precomputed after the last assistant reply, or unchanged since the last call;
+    #    only served to the session's own patient (on a miss the database service checks access)
+    owner_id = result_cache.owner_of(user.get("claims") if isinstance(user, dict) else None)
+    known_templates = template_cache.get(cancer_type)
+    hit = await result_cache.get(body.session_id, cancer_type, owner_id,
+                                 known_templates.version if known_templates else None)
+    if hit is not None:
+        return {"top_4": hit["top_4"], "top_15": hit["top_15"]}
+
+    # 1-4) fetch context, score and rank (also refreshes the result cache)
+    result = await compute_suggestions(body.session_id, cancer_type, user_token, owner_id)
+
+    # 5) persist last-4 after the response is sent
+    if result["top_4"]:
+        background_tasks.add_task(persist_last4, body.session_id, result["top_4"], user_token)
+
+    return result
+
+# ---- Embedding backfill ---------------------------------------------------
+_backfill_lock = asyncio.Lock()
+
+async def _run_backfill(user_token: str | None, cancer_type: str | None, batch_size: int) -> None:
+    async with _backfill_lock:
+        try:
+            updated = await backfill_template_embeddings(user_token, cancer_type, batch_size)
+            log.info(f"Template embedding backfill finished: {updated} templates")
+        except Exception as e:
+            log.error(f"Template embedding backfill failed: {e}")
+
+@app.post("/admin/backfill-embeddings", status_code=status.HTTP_202_ACCEPTED)
+async def backfill_embeddings(body: BackfillReq, background_tasks: BackgroundTasks,
+                              user=Depends(require_admin_or_service)):
+    """Encode missing/stale template embeddings in batches, outside the /suggest path.
+    Service token or admin JWT only (403 for other users)."""
+    if _backfill_lock.locked():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Backfill already running")
+    background_tasks.add_task(_run_backfill, user["token"], body.cancer_type, max(1, min(body.batch_size, 1000)))
+    return {"status": "started", "cancer_type": body.cancer_type}
@@ -0,0 +1,41 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+from ranking import hash_texts
+
+@dataclass
+class TemplateSet:
+    """Templates for one cancer type, ready for a single matrix-vector product."""
+    version: Optional[str]
+    ids: List[int]
+    texts: List[str]
+    matrix: np.ndarray       # (n, dim) C-contiguous float32, rows L2-normalized
+    text_hashes: np.ndarray  # (n,) uint64 hashes of the normalized texts
+
+_sets: Dict[str, TemplateSet] = {}
+_lock = threading.Lock()
+
+def cache_key(cancer_type: str) -> str:
+    return (cancer_type or "").strip().lower()
+
+def get(cancer_type: str) -> Optional[TemplateSet]:
+    with _lock:
+        return _sets.get(cache_key(cancer_type))
+
+def build(version: Optional[str], ids: List[int], texts: List[str], matrix: np.ndarray) -> TemplateSet:
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    matrix.flags.writeable = False  # shared across requests
+    return TemplateSet(version, ids, texts, matrix, hash_texts(texts))
+
+def put(cancer_type: str, entry: TemplateSet) -> TemplateSet:
+    with _lock:
+        _sets[cache_key(cancer_type)] = entry
+    return entry
+
+def invalidate(cancer_type: Optional[str] = None) -> None:
+    with _lock:
+        if cancer_type is None:
+            _sets.clear()
+        else:
+            _sets.pop(cache_key(cancer_type), None)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Union
+from typing import Annotated, List, Union
+from translation_service.config import BATCH_MAX_TEXTS
 
 #--- Pydantic models for data validation ---
 #these classes define the expected format for API's input and output
@@ -21,4 +22,26 @@ class Result(BaseModel):
     result: str | None = None #string could be None if it is still proccessing
     from_cache: bool = Field(default=False, description="Indicates if the result was retrieved from the cache.")
 
-JobOrResult = Union[JobResponse, Result]
\ No newline at end of file
+JobOrResult = Union[JobResponse, Result]
+
+#defines the structure for a POST request to /translate/batch
+#all texts share one target language, e.g. every {% ctrans %} string on a page
+class BatchTranslationRequest(BaseModel):
+    texts: List[Annotated[str, Field(min_length=1)]] = Field(
+        ..., min_length=1, max_length=BATCH_MAX_TEXTS, description="The texts to be translated"
+    )
+    target_language: str = Field(..., min_length=1, description="The code of the target language")
+
+#defines the outcome for one text of a batch request
+class BatchItem(BaseModel):
+    text: str
+    status: str
+    result: str | None = None
+    request_id: str | None = Field(default=None, description="Set when the text was queued by this request.")
+    from_cache: bool = False
+
+#defines the response for a batch request; items follow the order of the (de-duplicated) texts
+class BatchResponse(BaseModel):
+    target_language: str
+    job_id: str | None = Field(default=None, description="Set when any text was queued for translation.")
+    items: List[BatchItem]
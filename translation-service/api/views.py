@@ -3,9 +3,14 @@ import json
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Response, status
 
-from api.serializers import TranslationRequest, JobResponse, Result, JobOrResult
-from services.translation import get_translation_cache_key, RESULTS_CACHE_PREFIX, REQUEST_QUEUE_KEY
+from api.serializers import (
+    TranslationRequest, JobResponse, Result, JobOrResult,
+    BatchTranslationRequest, BatchItem, BatchResponse,
+)
+from services.translation import get_translation_cache_key, queue_key_for, RESULTS_CACHE_PREFIX
+from services import translation_memory
 from auth import verify_token
+from jwt_verifier import get_verifier
 from db import redis_client
 
 router = APIRouter()
@@ -17,7 +22,12 @@ logger = logging.getLogger(__name__)
 #checks the status of the service and its connection to Redis
 async def health_check():
     if redis_client and redis_client.ping():
-        return {"api_status": "ok", "redis_status": "ok"}
+        return {
+            "api_status": "ok",
+            "redis_status": "ok",
+            "auth_cache": get_verifier().stats(),
+            "translation_memory": translation_memory.stats(),
+        }
     raise HTTPException(status_code=503, detail="Service Unavailable: Cannot connect to Redis.")
 
 #defines the endpoint for submitting a new translation job
@@ -42,8 +52,16 @@ async def submit_translation(translation_request: TranslationRequest, response:
     #atomic operation: attempt to set the key if it does not exist
     was_set = redis_client.set(cache_key, in_progress_payload, ex=600, nx=True)
 
-    # --- Cache Miss and New Job ---
+    # --- Cache Miss ---
     if was_set:
+        #translated before by the current model: restore it to Redis instead of queueing a job
+        remembered = translation_memory.lookup(cache_key, translation_request.target_language)
+        if remembered is not None:
+            logger.info(f"Translation memory hit for key ending in: ...{truncated_key}")
+            redis_client.set(cache_key, json.dumps({'status': 'completed', 'result': remembered}), ex=3600)
+            return Result(status='completed', result=remembered, from_cache=True)
+
+        # --- New Job ---
         logger.info(f"Cache miss for key ending in: ...{truncated_key}. Submitting new job.")
         logger.info("job accepted")
         #generate a new, unique ID for this job request
@@ -56,8 +74,8 @@ async def submit_translation(translation_request: TranslationRequest, response:
             'lang': translation_request.target_language,
         }
 
-        #push job to the end of the worker queue in Redis
-        redis_client.rpush(REQUEST_QUEUE_KEY, json.dumps(task))
+        #push job to the end of the language's worker queue in Redis
+        redis_client.rpush(queue_key_for(translation_request.target_language), json.dumps(task))
         response.status_code = status.HTTP_202_ACCEPTED
         return JobResponse(message="Request accepted.", request_id=request_id)
 
@@ -74,6 +92,79 @@ async def submit_translation(translation_request: TranslationRequest, response:
         from_cache=True
     )
 
+@router.post(
+    '/translate/batch',
+    response_model=BatchResponse,
+    status_code=status.HTTP_200_OK,
+    tags=['Translation'],
+    dependencies=[Depends(verify_token)]
+)
+#accepts many texts for one language: cache hits are answered from a single MGET,
+#and only the misses are queued, together, as one job for the background worker
+async def submit_translation_batch(batch_request: BatchTranslationRequest, response: Response):
+    if not redis_client:
+        raise HTTPException(status_code=503, detail="Service Unavailable: Cannot Connect to Redis.")
+
+    lang = batch_request.target_language
+    #de-duplicate while keeping the caller's order
+    texts = list(dict.fromkeys(batch_request.texts))
+    cache_keys = [get_translation_cache_key(text, lang) for text in texts]
+
+    # --- Cache Check (one round-trip) ---
+    items = {}
+    misses = []
+    for text, cache_key, cached in zip(texts, cache_keys, redis_client.mget(cache_keys)):
+        if cached is None:
+            misses.append((text, cache_key))
+            continue
+        data = json.loads(cached)
+        items[text] = BatchItem(text=text, status=data.get('status'), result=data.get('result'), from_cache=True)
+
+    # --- Translation Memory ---
+    #misses translated before by the current model are restored to Redis, not queued
+    if misses:
+        remembered = translation_memory.lookup_many([cache_key for _, cache_key in misses], lang)
+        if remembered:
+            with redis_client.pipeline() as pipe:
+                for text, cache_key in misses:
+                    if cache_key in remembered:
+                        result = remembered[cache_key]
+                        pipe.set(cache_key, json.dumps({'status': 'completed', 'result': result}), ex=3600)
+                        items[text] = BatchItem(text=text, status='completed', result=result, from_cache=True)
+                pipe.execute()
+            misses = [(text, cache_key) for text, cache_key in misses if cache_key not in remembered]
+
+    # --- Cache Misses ---
+    job_id = None
+    if misses:
+        in_progress_payload = json.dumps({'status': 'in_progress', 'result': None})
+        #claim every missing key atomically, as /translate does, so concurrent requests don't queue duplicates
+        with redis_client.pipeline() as pipe:
+            for _, cache_key in misses:
+                pipe.set(cache_key, in_progress_payload, ex=600, nx=True)
+            claimed = pipe.execute()
+
+        job_items = []
+        for (text, _), was_set in zip(misses, claimed):
+            if was_set:
+                request_id = str(uuid.uuid4())
+                job_items.append({'id': request_id, 'text': text})
+                items[text] = BatchItem(text=text, status='in_progress', request_id=request_id)
+            else:
+                #another request queued it between the MGET and the SET
+                items[text] = BatchItem(text=text, status='in_progress', from_cache=True)
+
+        if job_items:
+            job_id = str(uuid.uuid4())
+            #one queue entry for the whole batch; the worker expands it into per-text jobs
+            task = {'id': job_id, 'lang': lang, 'items': job_items}
+            redis_client.rpush(queue_key_for(lang), json.dumps(task))
+            response.status_code = status.HTTP_202_ACCEPTED
+
+    logger.info(f"Batch of {len(texts)} texts for '{lang}': {len(texts) - len(misses)} cached, "
+                f"{len(misses)} sent for translation.")
+    return BatchResponse(target_language=lang, job_id=job_id, items=[items[text] for text in texts])
+
 @router.get(
     "/result/{request_id}", 
     response_model=Result,
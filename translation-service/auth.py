@@ -1,16 +1,13 @@
 import os
-import httpx
+import jwt
 from fastapi import Request, HTTPException, status
-
-#set this as an environment variable in Docker container
-#url of the central authentication service from healthcare-app project
-AUTH_SERVICE_URL = os.environ.get("AUTH_SERVICE_URL")
+from jwt_verifier import get_verifier
 
 #hardcoded secret for service-to-service communication
 SERVICE_TOKEN_SECRET = os.environ.get("TRANSLATION_SERVICE_TOKEN")
 
 #FastAPI dependency that replicates the authentication logic from the
-#healthcare-app's Django JWTAuthenticationMiddleware
+#healthcare-app's Django JWTAuthenticationMiddleware, verifying JWTs locally
 #(request: Request) - how FastAPI injects dependencies, its saying:
 #"before you run the endpoint code, run this function and pass it to current request object"
 async def verify_token(request: Request):
@@ -47,44 +44,25 @@ async def verify_token(request: Request):
 
     token = parts[1]
 
-    if not AUTH_SERVICE_URL:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Authentication service is not configured on this server."
-        )
-
-    #call the central auth service to verify the token
-    verify_url = f"{AUTH_SERVICE_URL}/api/auth/verify/"
-    headers = {'Authorization': f'Bearer {token}'}
-
+    #verify the token locally (shared secret or JWT_KEYS_FILE) instead of calling
+    #the auth service; repeat tokens are answered from the claims cache until they expire
     try:
-        #creates HTTP client session 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(verify_url, headers=headers, timeout=5.0)
-        
-        #check if the auth service successfully processed our request
-        if response.status_code == 200:
-            data = response.json()
-            #check if token is good
-            if data.get('valid'):
-                user_data = data.get('user', {})
-                return user_data
-            
-            #token was invalid
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token",
-            )
-
-        # auth service returned an error
+        claims = get_verifier().verify(token)
+    except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token: Could not be verified by auth service.",
+            detail="Token has expired",
         )
-
-    except httpx.RequestError as e:
-        #auth service is down or there was a network error
+    except jwt.InvalidTokenError:
         raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Authentication service unavailable: {e}",
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
         )
+
+    #same shape as the user the auth service's /verify/ returned, limited to the
+    #fields the token carries (no names, is_active or date_joined)
+    return {
+        "id": claims.get("user_id"),
+        "email": claims.get("email"),
+        "role_name": claims.get("role"),
+    }
@@ -0,0 +1,81 @@
+"""Benchmark: count-based batching (previous worker) vs length-bucketed batching.
+
+Replays a ctrans-like burst (mostly short UI labels, a few paragraphs, all queued
+at once as by /translate/batch) through one MarianMT model and reports
+throughput and per-job latency from the start of the burst.
+
+    python bench_batching.py --lang fr --jobs 200 --paragraph-share 0.1
+"""
+import argparse
+import random
+import statistics
+import time
+
+from services.batching import BatchScheduler
+from services.translation import get_translation_pipeline, token_lengths
+
+LABELS = [
+    "Apps", "Start chatting", "AI Assistant", "No recent activity", "Medical records",
+    "Upload a document", "Your appointments", "Settings", "Sign out", "View details",
+]
+PARAGRAPH = (
+    "Please bring a list of your current medications, recent test results and any "
+    "questions you have for your care team to your next appointment. If your symptoms "
+    "change before then, contact the clinic so that we can decide whether you need to "
+    "be seen sooner. "
+)
+
+def workload(n, paragraph_share, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    for i in range(n):
+        if rng.random() < paragraph_share:
+            texts.append(PARAGRAPH * rng.randint(1, 2) + f"({i})")
+        else:
+            texts.append(f"{rng.choice(LABELS)} {i}")
+    return texts
+
+def run_legacy(translator, texts, batch_size=8):
+    """Previous worker: fixed-size batches in queue order, pipeline called without batch_size."""
+    start = time.perf_counter()
+    latencies = []
+    for i in range(0, len(texts), batch_size):
+        translator(texts[i:i + batch_size])
+        latencies += [time.perf_counter() - start] * len(texts[i:i + batch_size])
+    return time.perf_counter() - start, latencies
+
+def run_bucketed(translator, lang, texts):
+    start = time.perf_counter()
+    scheduler = BatchScheduler()
+    jobs = [{'id': i, 'lang': lang, 'text': text} for i, text in enumerate(texts)]
+    for job, num_tokens in zip(jobs, token_lengths(lang, texts)):
+        scheduler.add(job, num_tokens)
+    latencies = []
+    for _, batch in scheduler.pop_ready(flush_all=True):
+        translator([job['text'] for job in batch], batch_size=len(batch))
+        latencies += [time.perf_counter() - start] * len(batch)
+    return time.perf_counter() - start, latencies
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lang", default="fr")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--paragraph-share", type=float, default=0.1)
+    args = parser.parse_args()
+
+    translator, error = get_translation_pipeline(args.lang)
+    if translator is None:
+        raise SystemExit(error)
+    texts = workload(args.jobs, args.paragraph_share)
+    translator(texts[:4])  # warm up
+
+    print(f"{'mode':>9} {'total s':>8} {'jobs/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, run in (("legacy", lambda: run_legacy(translator, texts)),
+                      ("bucketed", lambda: run_bucketed(translator, args.lang, texts))):
+        total, latencies = run()
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        print(f"{name:>9} {total:>8.2f} {len(texts) / total:>8.1f} "
+              f"{statistics.median(latencies) * 1000:>8.0f} {p95 * 1000:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import time
+from bisect import bisect_left
+
+from translation_service.config import (
+    LENGTH_BUCKETS, BATCH_TOKEN_BUDGET, BATCH_MAX_JOBS, BATCH_MAX_WAIT_MS
+)
+
+#--- Length-Bucketed Dynamic Batching ---
+#a batch is padded to its longest text, so a label batched with a paragraph costs
+#as much as the paragraph; jobs are therefore only batched with jobs of the same
+#language and similar token length, and batch sizes follow a token budget
+
+#smallest bucket bound that fits the text (texts past the last bound share the last bucket)
+def bucket_for(num_tokens: int) -> int:
+    return LENGTH_BUCKETS[min(bisect_left(LENGTH_BUCKETS, num_tokens), len(LENGTH_BUCKETS) - 1)]
+
+class BatchScheduler:
+    """
+    Holds popped jobs per (language, length bucket). A bucket is released as soon
+    as it holds a full batch for the token budget, or when its oldest job has
+    waited max_wait seconds, whichever comes first.
+    """
+
+    def __init__(self, token_budget: int = BATCH_TOKEN_BUDGET, max_jobs: int = BATCH_MAX_JOBS,
+                 max_wait: float = BATCH_MAX_WAIT_MS / 1000):
+        self.token_budget = token_budget
+        self.max_jobs = max_jobs
+        self.max_wait = max_wait
+        self._buckets = {}  # (lang, bucket) -> [(arrived_at, job)], oldest first
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._buckets.values())
+
+    #how many jobs of this bucket fit in one model call
+    def capacity(self, bucket: int) -> int:
+        return max(1, min(self.max_jobs, self.token_budget // bucket))
+
+    def add(self, job: dict, num_tokens: int, now: float | None = None) -> None:
+        key = (job['lang'], bucket_for(num_tokens))
+        self._buckets.setdefault(key, []).append((time.monotonic() if now is None else now, job))
+
+    #monotonic time at which the oldest waiting job must be flushed, None when idle
+    def next_deadline(self) -> float | None:
+        if not self._buckets:
+            return None
+        return min(entries[0][0] for entries in self._buckets.values()) + self.max_wait
+
+    #returns [(lang, jobs)] ready to translate, oldest first; flush_all releases everything
+    def pop_ready(self, now: float | None = None, flush_all: bool = False) -> list:
+        now = time.monotonic() if now is None else now
+        ready = []
+        for key in sorted(self._buckets, key=lambda k: self._buckets[k][0][0]):
+            lang, bucket = key
+            entries = self._buckets[key]
+            capacity = self.capacity(bucket)
+            #full batches go right away
+            while len(entries) >= capacity:
+                ready.append((lang, [job for _, job in entries[:capacity]]))
+                del entries[:capacity]
+            #a partial batch goes once its oldest job reaches the deadline
+            if entries and (flush_all or now - entries[0][0] >= self.max_wait):
+                ready.append((lang, [job for _, job in entries]))
+                entries.clear()
+            if not entries:
+                del self._buckets[key]
+        return ready
@@ -10,9 +10,11 @@ from asgiref.sync import async_to_sync
 from channels_redis.core import RedisChannelLayer
 
 from translation_service.config import (
-    LANGUAGE_CODES, HELSINKI_NAME_TEMPLATE, BATCH_SIZE, BATCH_TIMEOUT,
+    LANGUAGE_CODES, HELSINKI_NAME_TEMPLATE, MODEL_REVISION, BATCH_TIMEOUT, BATCH_DRAIN_MAX,
     TRANSLATION_CACHE_PREFIX, RESULTS_CACHE_PREFIX, REQUEST_QUEUE_KEY
 )
+from services import translation_memory
+from services.batching import BatchScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +67,18 @@ def get_translation_cache_key(text: str, lang: str):
     key_hash = hashlib.sha256(key_string).hexdigest()
     return f"{TRANSLATION_CACHE_PREFIX}{key_hash}"
 
+#name of the queue a job for this language is pushed to: one queue per supported
+#language, so a worker process can serve just its own languages; anything else
+#goes to the shared queue, which every worker also drains
+def queue_key_for(lang: str) -> str:
+    if lang in LANGUAGE_CODES:
+        return f"{REQUEST_QUEUE_KEY}:{lang}"
+    return REQUEST_QUEUE_KEY
+
+#queues drained by a worker serving the given languages (all of them by default)
+def queue_keys_for(langs=None) -> list:
+    return [queue_key_for(lang) for lang in sorted(langs or LANGUAGE_CODES)] + [REQUEST_QUEUE_KEY]
+
 #loads a specific translation model from Hugging Face
 #if the model is already loaded, it returns the cached instance
 def get_translation_pipeline(target_lang_code: str):
@@ -82,8 +96,12 @@ def get_translation_pipeline(target_lang_code: str):
         logger.info(f"Loading model: {model_name}...")
         try:
             #download and initialize the translation pipeline from Hugging Face
-            translator = pipeline('translation', model=model_name)
+            translator = pipeline('translation', model=model_name, revision=MODEL_REVISION)
             model_cache[model_name] = translator
+            #tag remembered translations with the commit the revision resolved to
+            translation_memory.record_loaded_model(
+                target_lang_code, getattr(translator.model.config, '_commit_hash', None)
+            )
             logger.info(f"Model {model_name} loaded and cached.")
             return translator, None
         except Exception as e:
@@ -91,97 +109,208 @@ def get_translation_pipeline(target_lang_code: str):
             logger.error(error_message)
             return None, error_message
 
-#runs continuously in a background thread to process jobs
-#fetches jobs from the Redis queue and processes them in batches
-def translation_worker(redis_client):
-    if not redis_client: return
+#turns one queue entry into the jobs it carries
+#a /translate/batch entry holds many texts for one language, each with its own request id
+def expand_task(task: dict) -> list:
+    if 'items' not in task:
+        return [task]
+    return [{'id': item['id'], 'text': item['text'], 'lang': task['lang']} for item in task['items']]
 
-    while True:
-        jobs_to_process = []
-        try:
-            #loop attempts to pull a batch of jobs from the queue
-            for _ in range(BATCH_SIZE):
-                #blpop is a "blocking pop". It waits for an item to appear or until the timeout
-                #this is highly efficient as it doesn't constantly poll Redis
-                task_json_tuple = redis_client.blpop(REQUEST_QUEUE_KEY, timeout=int(BATCH_TIMEOUT))
-
-                #timeout reached, process the jobs we have so far
-                if not task_json_tuple:
+#pops up to `limit` jobs: blocks for up to `timeout` seconds for the first entry on any of
+#the queues (not at all when timeout is 0), then takes what else is already queued. The
+#limit counts expanded jobs, not entries (a /translate/batch entry may carry hundreds), so
+#entries are popped in rounds sized by what is left, then one at a time once little is
+#left; jobs past the limit (the tail of the last batch entry) go back to the front of their queues
+def drain_queue(redis_client, queue_keys: list, timeout: float, limit: int = BATCH_DRAIN_MAX) -> list:
+    jobs = []
+    entries = 0
+    if timeout > 0:
+        #blpop is a "blocking pop". It waits for an item to appear or until the timeout
+        task_json_tuple = redis_client.blpop(queue_keys, timeout=timeout)
+        if not task_json_tuple:
+            return []
+        #the item from Redis is a JSON string, so we parse it into a Python dict
+        jobs.extend(expand_task(json.loads(task_json_tuple[1])))
+        entries += 1
+
+    while len(jobs) < limit:
+        #size each round by the jobs per entry seen so far, so batch entries don't overshoot
+        jobs_per_entry = max(1.0, len(jobs) / entries) if entries else 1.0
+        per_queue = int((limit - len(jobs)) / (len(queue_keys) * jobs_per_entry))
+        if per_queue >= 1:
+            #lpop with a count never blocks (Redis >= 6.2); one round-trip for all queues
+            with redis_client.pipeline(transaction=False) as pipe:
+                for queue_key in queue_keys:
+                    pipe.lpop(queue_key, per_queue)
+                raw_tasks = [raw for popped in pipe.execute() for raw in (popped or [])]
+        else:
+            #only a few jobs of room left: take a single entry from the first non-empty queue
+            raw_tasks = []
+            for queue_key in queue_keys:
+                raw_task = redis_client.lpop(queue_key)
+                if raw_task is not None:
+                    raw_tasks.append(raw_task)
                     break
+        if not raw_tasks:
+            break
+        for raw_task in raw_tasks:
+            jobs.extend(expand_task(json.loads(raw_task)))
+        entries += len(raw_tasks)
+
+    if len(jobs) > limit:
+        requeue_jobs(redis_client, jobs[limit:], front=True)
+        jobs = jobs[:limit]
+    return jobs
 
-                #the item from Redis is a JSON string, so we parse it into a Python dict
-                jobs_to_process.append(json.loads(task_json_tuple[1]))
+#puts jobs taken off the queues but never started back on their language queues:
+#at the back (shutdown), or at the front in their original order (drain overflow)
+def requeue_jobs(redis_client, jobs: list, front: bool = False) -> None:
+    with redis_client.pipeline(transaction=False) as pipe:
+        for job in (reversed(jobs) if front else jobs):
+            entry = json.dumps({'id': job['id'], 'text': job['text'], 'lang': job['lang']})
+            if front:
+                pipe.lpush(queue_key_for(job['lang']), entry)
+            else:
+                pipe.rpush(queue_key_for(job['lang']), entry)
+        pipe.execute()
+
+#token count of each text under the language's tokenizer, used to pick its length bucket
+def token_lengths(lang: str, texts: list) -> list:
+    translator_pipeline, _ = get_translation_pipeline(lang)
+    if translator_pipeline is not None:
+        try:
+            return [len(ids) for ids in translator_pipeline.tokenizer(texts)['input_ids']]
         except Exception as e:
-            logger.error(f"Error popping job from Redis: {e}")
-            time.sleep(BATCH_TIMEOUT)
-            continue
+            logger.warning(f"Tokenizing for length buckets failed for language {lang}: {e}")
+    #rough estimate; jobs for a model that failed to load are failed regardless of bucket
+    return [len(text) // 4 + 1 for text in texts]
 
-        #if no jobs were fetched, loop again to wait for more.
-        if not jobs_to_process:
-            continue
+#runs continuously in a background thread or worker process to process jobs
+#drains the Redis queues into a length-bucketed scheduler and translates each batch it releases
+#returns once stop_event is set; jobs it holds but has not started go back on their queues
+def translation_worker(redis_client, queue_keys=None, stop_event=None):
+    if not redis_client: return
+
+    queue_keys = queue_keys or queue_keys_for()
+    scheduler = BatchScheduler()
+    while stop_event is None or not stop_event.is_set():
+        #block only while idle; with jobs waiting, never past the earliest batch deadline
+        deadline = scheduler.next_deadline()
+        timeout = BATCH_TIMEOUT if deadline is None else max(0.0, deadline - time.monotonic())
+        #hold no more than a few batches; the rest stay queued for other workers
+        room = BATCH_DRAIN_MAX - len(scheduler)
+        if room <= 0:
+            time.sleep(timeout)
+            jobs = []
+        else:
+            try:
+                jobs = drain_queue(redis_client, queue_keys, timeout, room)
+            except Exception as e:
+                logger.error(f"Error popping job from Redis: {e}")
+                time.sleep(BATCH_TIMEOUT)
+                continue
 
-        logger.info(f"Processing a batch of {len(jobs_to_process)} jobs.")
-        #group jobs by target language so we can process them with the same model
+        #group jobs by target language so each language is tokenized in one call
         grouped_by_lang = {}
-        for job in jobs_to_process:
-            lang = job['lang']
-            grouped_by_lang.setdefault(lang, []).append(job)
+        for job in jobs:
+            grouped_by_lang.setdefault(job['lang'], []).append(job)
+        for lang, lang_jobs in grouped_by_lang.items():
+            for job, num_tokens in zip(lang_jobs, token_lengths(lang, [job['text'] for job in lang_jobs])):
+                scheduler.add(job, num_tokens)
 
-        #process each language group as a separate batch.
-        for lang, jobs in grouped_by_lang.items():
-            translator_pipeline, error = get_translation_pipeline(lang)
+        for lang, batch in scheduler.pop_ready():
+            process_batch(redis_client, lang, batch)
 
-            #if model failed to load, mark all jobs for this language as failed
-            if not translator_pipeline:
-                for job in jobs:
-                    job['status'] = 'failed'
-                    job['result'] = error
-                continue
+    #hand unstarted jobs back rather than translating them all before exiting
+    batches = scheduler.pop_ready(flush_all=True)
+    held = [job for _, batch in batches for job in batch]
+    if held:
+        try:
+            requeue_jobs(redis_client, held)
+            logger.info(f"Returned {len(held)} unstarted jobs to their queues.")
+        except Exception as e:
+            logger.error(f"Error returning {len(held)} jobs to Redis, translating them instead: {e}")
+            for lang, batch in batches:
+                process_batch(redis_client, lang, batch)
+
+#translates one batch of same-language, similar-length jobs and publishes the results
+def process_batch(redis_client, lang: str, jobs_to_process: list):
+    #strings already in the translation memory (e.g. queued twice) skip the model
+    remembered = translation_memory.lookup_many(
+        [get_translation_cache_key(job['text'], lang) for job in jobs_to_process], lang
+    )
+    jobs = []
+    for job in jobs_to_process:
+        result = remembered.get(get_translation_cache_key(job['text'], lang))
+        if result is not None:
+            job['status'] = 'completed'
+            job['result'] = result
+        else:
+            jobs.append(job)
+
+    if jobs:
+        logger.info(f"Translating a batch of {len(jobs)} '{lang}' jobs.")
+        translator_pipeline, error = get_translation_pipeline(lang)
 
+        #if model failed to load, mark all jobs for this language as failed
+        if not translator_pipeline:
+            for job in jobs:
+                job['status'] = 'failed'
+                job['result'] = error
+        else:
             try:
                 #create a list of just the texts to be translated
                 texts = [job['text'] for job in jobs]
 
-                #pass the entire list to the pipeline for efficient, batched translation
-                translated_results = translator_pipeline(texts)
+                #run the whole batch through the model in a single forward pass;
+                #without batch_size the pipeline would translate the texts one by one
+                translated_results = translator_pipeline(texts, batch_size=len(texts))
 
                 #map the results back to their original jobs
                 for i, job in enumerate(jobs):
                     job['status'] = 'completed'
                     job['result'] = translated_results[i]['translation_text']
+                    job['translated'] = True
             except Exception as e:
                 logger.error(f"Error during batch translation for language {lang}: {e}")
                 for job in jobs:
                     job['status'] = 'failed'
                     job['result'] = "Error during batch processing."
-        
-        # --- Save all results back to Redis ---
-        try:
-            #use a Redis pipeline to execute multiple commands in a single network round-trip for efficiency
-            with redis_client.pipeline() as pipe:
-                for job in jobs_to_process:
-                    on_translation_complete(
-                        request_id=job['id'], 
-                        translated_text=job['result'], 
-                        status=job['status']
-                    )
-                    cache_key = get_translation_cache_key(job['text'], job['lang'])
-
-                    #create the final payload.
-                    final_payload = json.dumps({
-                        'status': job['status'],
-                        'result': job['result']
-                    })
-
-                    #overwrite the 'in_progress' status with the final result
-                    #set a long expiry (e.g., 1 hour) for the completed translation
-                    pipe.set(cache_key, final_payload, ex=3600)
-
-                    #store the final job status and result for user pickup
-                    result_key = f"{RESULTS_CACHE_PREFIX}{job['id']}"
-                    pipe.set(result_key, final_payload, ex=300) # result available for 5 mins
-
-                pipe.execute()
-            logger.info(f"Successfully saved results for {len(jobs_to_process)} jobs to Redis.")
-        except Exception as e:
-            logger.error(f"Error saving results to Redis: {e}")
+
+    # --- Persist new translations ---
+    #only translations produced by the model in this batch, not ones read back from the memory
+    translation_memory.store_many([
+        (get_translation_cache_key(job['text'], job['lang']), job['lang'], job['text'], job['result'])
+        for job in jobs_to_process if job.get('status') == 'completed' and job.get('translated')
+    ])
+
+    # --- Save all results back to Redis ---
+    try:
+        #use a Redis pipeline to execute multiple commands in a single network round-trip for efficiency
+        with redis_client.pipeline() as pipe:
+            for job in jobs_to_process:
+                on_translation_complete(
+                    request_id=job['id'], 
+                    translated_text=job['result'], 
+                    status=job['status']
+                )
+                cache_key = get_translation_cache_key(job['text'], job['lang'])
+
+                #create the final payload.
+                final_payload = json.dumps({
+                    'status': job['status'],
+                    'result': job['result']
+                })
+
+                #overwrite the 'in_progress' status with the final result
+                #set a long expiry (e.g., 1 hour) for the completed translation
+                pipe.set(cache_key, final_payload, ex=3600)
+
+                #store the final job status and result for user pickup
+                result_key = f"{RESULTS_CACHE_PREFIX}{job['id']}"
+                pipe.set(result_key, final_payload, ex=300) # result available for 5 mins
+
+            pipe.execute()
+        logger.info(f"Successfully saved results for {len(jobs_to_process)} jobs to Redis.")
+    except Exception as e:
+        logger.error(f"Error saving results to Redis: {e}")
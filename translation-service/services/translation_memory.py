@@ -0,0 +1,229 @@
+import os
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+
+from translation_service.config import (
+    LANGUAGE_CODES, HELSINKI_NAME_TEMPLATE, MODEL_REVISION, TRANSLATION_MEMORY_PATH
+)
+
+logger = logging.getLogger(__name__)
+
+#--- Persistent Translation Memory ---
+#every completed translation is kept here, keyed like the Redis cache, so a
+#string is only ever run through a model once per model version; the Redis
+#cache in front of it can expire freely
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    cache_key     TEXT PRIMARY KEY,
+    lang          TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    source_text   TEXT NOT NULL,
+    result        TEXT NOT NULL,
+    created_at    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS model_versions (
+    lang          TEXT PRIMARY KEY,
+    model_version TEXT NOT NULL,
+    loaded_at     REAL NOT NULL
+);
+"""
+
+#seconds the API trusts the model versions it last read from the model_versions table
+_VERSIONS_TTL = 60
+
+#sqlite connections can't be shared across threads, so each thread gets its own
+_local = threading.local()
+_disabled = False
+
+#nor across processes: a forked worker process opens its own connections
+def _forget_connections():
+    global _local
+    _local = threading.local()
+
+os.register_at_fork(after_in_child=_forget_connections)
+
+#--- Model Versions ---
+#a translation is tagged with the commit the loaded model actually resolved to, since
+#a revision like 'main' moves; the worker (which loads the models) records them in the
+#model_versions table and the API, which never loads a model, reads them from there
+_loaded_versions = {}   # lang -> version of the model loaded in this process
+_recorded_versions = {} # lang -> version read from the table
+_recorded_at = None
+
+def _version_string(lang: str, commit_hash: str | None) -> str:
+    return f"{HELSINKI_NAME_TEMPLATE.format(lang_code=lang)}@{commit_hash or MODEL_REVISION}"
+
+#called once a model is loaded, with the commit hash it resolved to (config._commit_hash)
+def record_loaded_model(lang: str, commit_hash: str | None) -> str:
+    version = _version_string(lang, commit_hash)
+    _loaded_versions[lang] = version
+    conn = _connection()
+    if conn is not None:
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO model_versions (lang, model_version, loaded_at) VALUES (?, ?, ?)",
+                    (lang, version, time.time()),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Translation memory could not record the model version for {lang}: {e}")
+    return version
+
+def _recorded_model_versions() -> dict:
+    global _recorded_versions, _recorded_at
+    if _recorded_at is not None and time.monotonic() - _recorded_at < _VERSIONS_TTL:
+        return _recorded_versions
+    conn = _connection()
+    if conn is None:
+        return {}
+    try:
+        _recorded_versions = dict(conn.execute("SELECT lang, model_version FROM model_versions"))
+        _recorded_at = time.monotonic()
+    except sqlite3.Error as e:
+        logger.error(f"Translation memory could not read model versions: {e}")
+    return _recorded_versions
+
+#identifies the model that produced a translation; rows from any other version are never
+#served. None until a worker has loaded the language's model, and nothing is remembered meanwhile
+def model_version(lang: str) -> str | None:
+    if lang in _loaded_versions:
+        return _loaded_versions[lang]
+    return _recorded_model_versions().get(lang)
+
+def _connection():
+    global _disabled
+    if _disabled:
+        return None
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        return conn
+    try:
+        os.makedirs(os.path.dirname(TRANSLATION_MEMORY_PATH) or '.', exist_ok=True)
+        conn = sqlite3.connect(TRANSLATION_MEMORY_PATH, timeout=5)
+        #WAL lets the API keep reading while the worker writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+    except (OSError, sqlite3.Error) as e:
+        #the memory is an optimization; without it every Redis miss is translated again
+        logger.error(f"Translation memory disabled, cannot open {TRANSLATION_MEMORY_PATH}: {e}")
+        _disabled = True
+        return None
+    _local.conn = conn
+    return conn
+
+#returns {cache_key: result} for the keys translated by the current model for this language
+def lookup_many(cache_keys: list, lang: str) -> dict:
+    conn = _connection()
+    version = model_version(lang)
+    if conn is None or not cache_keys or version is None:
+        return {}
+    found = {}
+    try:
+        #stay well below sqlite's bound-parameter limit
+        for start in range(0, len(cache_keys), 500):
+            chunk = cache_keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT cache_key, result FROM translations "
+                f"WHERE model_version = ? AND cache_key IN ({placeholders})",
+                [version, *chunk],
+            )
+            found.update(rows)
+    except sqlite3.Error as e:
+        logger.error(f"Translation memory lookup failed: {e}")
+    return found
+
+def lookup(cache_key: str, lang: str):
+    return lookup_many([cache_key], lang).get(cache_key)
+
+#stores completed translations; rows are (cache_key, lang, source_text, result)
+def store_many(rows: list) -> None:
+    conn = _connection()
+    if conn is None or not rows:
+        return
+    now = time.time()
+    #only translations from a model whose version is known can be served back later
+    versioned = [(key, lang, model_version(lang), text, result, now) for key, lang, text, result in rows]
+    versioned = [row for row in versioned if row[2] is not None]
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(cache_key, lang, model_version, source_text, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                versioned,
+            )
+    except sqlite3.Error as e:
+        logger.error(f"Translation memory write failed: {e}")
+
+#deletes rows produced by any model other than the current one for their language (e.g.
+#after the revision moves or TRANSLATION_MODEL_REVISION changes); languages whose model
+#version isn't known yet are left alone. Returns the number of rows removed
+def invalidate_stale() -> int:
+    conn = _connection()
+    if conn is None:
+        return 0
+    removed = 0
+    with conn:
+        for lang in sorted(LANGUAGE_CODES):
+            version = model_version(lang)
+            if version is None:
+                continue
+            cursor = conn.execute(
+                "DELETE FROM translations WHERE lang = ? AND model_version != ?", (lang, version)
+            )
+            removed += cursor.rowcount
+    return removed
+
+#deletes every row, or every row for one language; returns the number of rows removed
+def clear(lang: str | None = None) -> int:
+    conn = _connection()
+    if conn is None:
+        return 0
+    with conn:
+        if lang:
+            cursor = conn.execute("DELETE FROM translations WHERE lang = ?", (lang,))
+        else:
+            cursor = conn.execute("DELETE FROM translations")
+    return cursor.rowcount
+
+def stats() -> dict:
+    conn = _connection()
+    if conn is None:
+        return {"enabled": False}
+    try:
+        rows = conn.execute("SELECT model_version, COUNT(*) FROM translations GROUP BY model_version")
+        versions = conn.execute("SELECT lang, model_version FROM model_versions")
+        return {"enabled": True, "path": TRANSLATION_MEMORY_PATH, "entries": dict(rows),
+                "model_versions": dict(versions)}
+    except sqlite3.Error as e:
+        return {"enabled": True, "path": TRANSLATION_MEMORY_PATH, "error": str(e)}
+
+#command line maintenance:
+#   python -m services.translation_memory stats
+#   python -m services.translation_memory invalidate-stale
+#   python -m services.translation_memory clear [--lang fr]
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the translation memory.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats")
+    sub.add_parser("invalidate-stale")
+    clear_parser = sub.add_parser("clear")
+    clear_parser.add_argument("--lang", choices=sorted(LANGUAGE_CODES))
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(stats())
+    elif args.command == "invalidate-stale":
+        print(f"Removed {invalidate_stale()} stale translations.")
+    else:
+        print(f"Removed {clear(args.lang)} translations.")
+
+if __name__ == "__main__":
+    main()
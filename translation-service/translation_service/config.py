@@ -12,6 +12,9 @@ torch.set_num_threads(1)
 HELSINKI_NAME_TEMPLATE = "Helsinki-NLP/opus-mt-en-{lang_code}"
 #set of supported language codes
 LANGUAGE_CODES = {"fr", "es", "zh", "hi", "ar"}
+#model revision (branch, tag or commit) loaded from Hugging Face
+#changing it invalidates everything in the translation memory for the affected models
+MODEL_REVISION = os.environ.get('TRANSLATION_MODEL_REVISION', 'main')
 
 # --- Redis Configuration ---
 REDIS_HOST = os.environ.get('REDIS_HOST', 'redis')
@@ -23,15 +26,42 @@ RESULTS_CACHE_PREFIX = "translation_result:"
 #prefix for keys where final, completed translations are cached for reuse
 TRANSLATION_CACHE_PREFIX = "translation_cache:"
 
+# --- Translation Memory ---
+#SQLite file holding every completed translation, shared by the API and the worker
+TRANSLATION_MEMORY_PATH = os.environ.get('TRANSLATION_MEMORY_PATH', '/home/appuser/data/translation_memory.sqlite3')
+
 # --- Worker Configuration ---
-#max number of jobs the worker will pull from the queue at one time
-BATCH_SIZE = 8
-#number of seconds the worker will wait for a new job before checking again
+#number of seconds an idle worker will wait for a new job before checking again
 BATCH_TIMEOUT = 1.0
+#upper bounds (in tokens) of the length buckets; jobs are only batched with similar lengths
+LENGTH_BUCKETS = (16, 32, 64, 128, 256, 512)
+#padded tokens per model call (batch size x bucket bound), e.g. 256 labels or 8 long paragraphs
+BATCH_TOKEN_BUDGET = int(os.environ.get('BATCH_TOKEN_BUDGET', 4096))
+#max texts per model call, whatever the budget allows
+BATCH_MAX_JOBS = int(os.environ.get('BATCH_MAX_JOBS', 64))
+#max jobs (texts, not queue entries) a worker holds in its scheduler; it only drains
+#the queues up to this many, leaving the rest queued for other workers (and safe across a restart)
+BATCH_DRAIN_MAX = int(os.environ.get('BATCH_DRAIN_MAX', BATCH_MAX_JOBS * 4))
+#a job waits at most this long for its batch to fill before it is translated anyway
+BATCH_MAX_WAIT_MS = int(os.environ.get('BATCH_MAX_WAIT_MS', 20))
 NUM_WORKER_THREADS = 3
+#"threads": NUM_WORKER_THREADS threads in one process, sharing the models (and the GIL)
+#"processes": a pool of NUM_WORKER_PROCESSES single-threaded processes forked after the
+#models are loaded, so the model weights are shared copy-on-write
+WORKER_MODE = os.environ.get('WORKER_MODE', 'threads')
+#defaults to the CPUs this process may run on (its cgroup/cpuset affinity), not the host's
+_AVAILABLE_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+NUM_WORKER_PROCESSES = int(os.environ.get('NUM_WORKER_PROCESSES', _AVAILABLE_CPUS))
+#"core": every process drains every language queue
+#"language": each process drains only the queues of the languages assigned to it
+WORKER_PROCESS_LAYOUT = os.environ.get('WORKER_PROCESS_LAYOUT', 'core')
+#seconds a stopping worker gets to finish the batch it is translating before it is killed
+WORKER_SHUTDOWN_TIMEOUT = float(os.environ.get('WORKER_SHUTDOWN_TIMEOUT', 30))
+
+# --- API Configuration ---
+#max number of texts accepted by a single /translate/batch request
+BATCH_MAX_TEXTS = int(os.environ.get('BATCH_MAX_TEXTS', 500))
 
 # --- Auth Configuration ---
-#URL for the central auth service, which must be provided by an environment variable
-AUTH_SERVICE_URL = os.environ.get("AUTH_SERVICE_URL")
 #secret token for secure communication between this service and other internal services
 SERVICE_TOKEN_SECRET = "db-service-secret-token"
\ No newline at end of file
@@ -1,45 +1,145 @@
 import os
-import logging
+import gc
 import sys
-from threading import Thread
+import time
+import signal
+import logging
+import multiprocessing
+import multiprocessing.connection
+from threading import Thread, Event
 
 sys.path.append('.')
 
-from services.translation import translation_worker, get_translation_pipeline
-from translation_service.config import LANGUAGE_CODES, NUM_WORKER_THREADS
+from services.translation import translation_worker, get_translation_pipeline, queue_keys_for
+from services import translation_memory
+from translation_service.config import (
+    LANGUAGE_CODES, NUM_WORKER_THREADS, WORKER_MODE, NUM_WORKER_PROCESSES,
+    WORKER_PROCESS_LAYOUT, WORKER_SHUTDOWN_TIMEOUT
+)
 from db import redis_client
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-#pre-loads all the ML models into the shared memory for this process
-#spawns multiple worker threads to process jobs concurrently
-def main():
-    logger.info("--- Starting Multi-Threaded Translation Worker Process ---")
-
-    if not redis_client:
-        logger.error("Could not connect to Redis. Worker cannot start.")
-        return
+#SIGTERM/SIGINT set the stop event: workers finish the batch they are translating,
+#return the jobs they hold but haven't started to the queues, then exit
+def install_stop_handlers(stop_event: Event):
+    def handle(signum, frame):
+        logger.info(f"Received signal {signum}; finishing the current batch...")
+        stop_event.set()
+    signal.signal(signal.SIGTERM, handle)
+    signal.signal(signal.SIGINT, handle)
 
-    #pre-load model once into main thread
-    #this model cache will be shared by all threads spawned in this process
+#pre-loads all the ML models into this process's memory; they are shared by the
+#threads it spawns, or copy-on-write by the processes it forks
+def preload_models():
     logger.info(f"Main process ({__name__}): Pre-loading all supported translation models...")
     for code in LANGUAGE_CODES:
         get_translation_pipeline(code)
     logger.info(f"Main Process ({__name__}): All models loaded and ready to be shared.")
 
+    #drop remembered translations produced by models other than the ones just loaded
+    removed = translation_memory.invalidate_stale()
+    if removed:
+        logger.info(f"Removed {removed} translations made by previous model versions from the translation memory.")
+
+#threads mode: several worker threads in this process
+def run_threads():
+    stop_event = Event()
+    install_stop_handlers(stop_event)
+
     #create and start worker threads
     threads = []
     for i in range(NUM_WORKER_THREADS):
         logger.info(f"Starting worker thread {i+1}/{NUM_WORKER_THREADS}...")
-        thread = Thread(target=translation_worker, args=(redis_client,))
-        thread.daemon = True
+        thread = Thread(target=translation_worker, args=(redis_client, None, stop_event))
         threads.append(thread)
         thread.start()
 
-    #keep the main process alive
+    #keep the main process alive until every thread has stopped
     for thread in threads:
         thread.join()
 
+#languages drained by each process in the "language" layout; extra processes
+#double up on languages, fewer processes than languages take several each
+def assign_languages(num_processes: int) -> list:
+    langs = sorted(LANGUAGE_CODES)
+    if num_processes >= len(langs):
+        return [[langs[i % len(langs)]] for i in range(num_processes)]
+    return [langs[i::num_processes] for i in range(num_processes)]
+
+#entry point of a forked worker process: a single translation loop on its own queues
+def process_main(index: int, queue_keys: list):
+    stop_event = Event()
+    install_stop_handlers(stop_event)
+    logger.info(f"Worker process {index} (pid {os.getpid()}) draining {', '.join(queue_keys)}")
+    translation_worker(redis_client, queue_keys, stop_event)
+    logger.info(f"Worker process {index} stopped.")
+
+#processes mode: a supervised pool of single-threaded worker processes
+def run_processes():
+    if WORKER_PROCESS_LAYOUT == 'language':
+        queue_sets = [queue_keys_for(langs) for langs in assign_languages(NUM_WORKER_PROCESSES)]
+    else:
+        queue_sets = [queue_keys_for()] * NUM_WORKER_PROCESSES
+
+    #fork after the models are loaded so their weights are shared copy-on-write;
+    #freezing the gc keeps collections in the children from touching (and copying)
+    #the pages that hold the parent's objects
+    context = multiprocessing.get_context('fork')
+    gc.freeze()
+
+    stop_event = Event()
+    install_stop_handlers(stop_event)
+
+    def spawn(index):
+        process = context.Process(
+            target=process_main, args=(index, queue_sets[index]), name=f"translation-worker-{index}"
+        )
+        process.start()
+        return process
+
+    logger.info(f"Starting {len(queue_sets)} worker processes ({WORKER_PROCESS_LAYOUT} layout)...")
+    processes = {index: spawn(index) for index in range(len(queue_sets))}
+
+    #restart any process that dies unexpectedly until asked to stop
+    while not stop_event.is_set():
+        exited = multiprocessing.connection.wait([p.sentinel for p in processes.values()], timeout=1.0)
+        for index, process in list(processes.items()):
+            if process.sentinel not in exited:
+                continue
+            logger.error(f"Worker process {index} exited with code {process.exitcode}.")
+            #back off briefly so a process that fails on start doesn't spin
+            if stop_event.wait(1):
+                break
+            logger.info(f"Restarting worker process {index}...")
+            processes[index] = spawn(index)
+
+    #forward the stop (SIGTERM) and give every process time to finish its current batch
+    for process in processes.values():
+        if process.is_alive():
+            process.terminate()
+    deadline = time.monotonic() + WORKER_SHUTDOWN_TIMEOUT
+    for index, process in processes.items():
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            logger.warning(f"Worker process {index} did not stop in time; killing it.")
+            process.kill()
+            process.join()
+
+def main():
+    logger.info(f"--- Starting Translation Worker ({WORKER_MODE} mode) ---")
+
+    if not redis_client:
+        logger.error("Could not connect to Redis. Worker cannot start.")
+        return
+
+    preload_models()
+    if WORKER_MODE == 'processes':
+        run_processes()
+    else:
+        run_threads()
+    logger.info("--- Translation Worker stopped ---")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()